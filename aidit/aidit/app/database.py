@@ -2,8 +2,13 @@
 Database models and operations using Supabase client
 """
 import os
+import time
 import logging
-from datetime import datetime
+import asyncio
+import threading
+import httpx
+import supabase
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
 import enum
@@ -14,218 +19,525 @@ logger = logging.getLogger(__name__)
 
 # Initialize Supabase client
 _supabase_client = None
+_async_supabase_client = None
+_init_lock = threading.Lock()
+_async_init_lock = asyncio.Lock()
+
+# Connection pool for the async client's PostgREST and storage sessions:
+# SUPABASE_POOL_SIZE persistent keep-alive connections, up to SUPABASE_MAX_OVERFLOW extra
+# under bursts, waiting at most SUPABASE_POOL_TIMEOUT_SECONDS for a free connection
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", os.getenv("SUPABASE_MAX_CONNECTIONS", "20")))
+SUPABASE_MAX_OVERFLOW = int(os.getenv("SUPABASE_MAX_OVERFLOW", "10"))
+SUPABASE_POOL_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_POOL_TIMEOUT_SECONDS", "30"))
+SUPABASE_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "10"))
+# Idle connections are dropped before the server side closes them, so a reused connection is live
+SUPABASE_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY_SECONDS", "30"))
+
+
+def _get_supabase_credentials():
+    """Read Supabase URL and key from environment"""
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_KEY")
+    
+    if not supabase_url or not supabase_key:
+        raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment")
+    
+    return supabase_url, supabase_key
+
 
 def get_supabase_client():
     """Get or create Supabase client"""
     global _supabase_client
     if _supabase_client is None:
+        with _init_lock:
+            if _supabase_client is None:
+                try:
+                    supabase_url, supabase_key = _get_supabase_credentials()
+                    
+                    _supabase_client = supabase.create_client(supabase_url, supabase_key)
+                    logger.info("Supabase client initialized successfully")
+                except Exception as e:
+                    logger.error(f"Failed to initialize Supabase client: {e}")
+                    raise
+    
+    return _supabase_client
+
+
+def probe_tables(tables: List[str]) -> Dict[str, Optional[Exception]]:
+    """
+    Check which tables exist, probing all of them concurrently
+    
+    PostgREST doesn't expose information_schema, so each table is probed with a
+    one-row select; running the probes in parallel costs one round-trip, not one per table.
+    
+    Args:
+        tables: Table names to check
+        
+    Returns:
+        Dict of table name -> None if the probe succeeded, else the exception it raised
+    """
+    client = get_supabase_client()
+    
+    def probe(table: str) -> Optional[Exception]:
         try:
-            import supabase
-            supabase_url = os.getenv("SUPABASE_URL")
-            supabase_key = os.getenv("SUPABASE_KEY")
-            
-            if not supabase_url or not supabase_key:
-                raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment")
-            
-            _supabase_client = supabase.create_client(supabase_url, supabase_key)
-            logger.info("Supabase client initialized successfully")
-        except ImportError:
-            raise ImportError("supabase library is required. Install it with: pip install supabase")
+            client.table(table).select("id").limit(1).execute()
+            return None
         except Exception as e:
-            logger.error(f"Failed to initialize Supabase client: {e}")
-            raise
+            return e
     
-    return _supabase_client
+    with ThreadPoolExecutor(max_workers=max(1, len(tables))) as executor:
+        return dict(zip(tables, executor.map(probe, tables)))
+
+
+async def _pooled_session(session: httpx.AsyncClient) -> httpx.AsyncClient:
+    """Replace an httpx session with one using explicit pool limits, keeping its base URL and headers"""
+    pooled = httpx.AsyncClient(
+        base_url=session.base_url,
+        headers=session.headers,
+        limits=httpx.Limits(
+            max_connections=SUPABASE_POOL_SIZE + SUPABASE_MAX_OVERFLOW,
+            max_keepalive_connections=SUPABASE_POOL_SIZE,
+            keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY_SECONDS
+        ),
+        timeout=httpx.Timeout(SUPABASE_TIMEOUT_SECONDS, connect=2.0, pool=SUPABASE_POOL_TIMEOUT_SECONDS),
+        follow_redirects=True,
+        http2=True
+    )
+    await session.aclose()
+    return pooled
+
+
+async def get_async_supabase_client():
+    """Get or create async Supabase client (does not block the event loop on queries)"""
+    global _async_supabase_client
+    if _async_supabase_client is None:
+        async with _async_init_lock:
+            if _async_supabase_client is None:
+                try:
+                    supabase_url, supabase_key = _get_supabase_credentials()
+                    
+                    client = await supabase.acreate_client(supabase_url, supabase_key)
+                    
+                    # Swap in keep-alive pooled sessions so bursts reuse warm connections
+                    client.postgrest.session = await _pooled_session(client.postgrest.session)
+                    storage = client.storage
+                    storage._client = storage.session = await _pooled_session(storage._client)
+                    
+                    _async_supabase_client = client
+                    logger.info(
+                        f"Async Supabase client initialized successfully "
+                        f"(pool_size={SUPABASE_POOL_SIZE}, max_overflow={SUPABASE_MAX_OVERFLOW})"
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to initialize async Supabase client: {e}")
+                    raise
+    
+    return _async_supabase_client
+
+
+# Default column projections for read paths (heavy JSON/text columns are opt-in via `fields`)
+MEDIA_FIELDS = "id,video_id,video_url,media_type"
+VIDEO_PROCESSING_FIELDS = "id,video_id,status,granularity_seconds,model,total_frames,processed_frames,failed_frames,error_message"
+IMAGE_PROCESSING_FIELDS = "id,video_id,status,model,created_at"
+FRAME_FIELDS = "id,frame_number,timestamp_seconds,status,llm_response,error_message"
+SCENE_INDEX_FIELDS = "id,video_id,video_db_id,index_id,extraction_type,status,scene_count"
+TRANSCRIPTION_FIELDS = "id,video_id,language_code,status,segment_count"
+
+async def close_clients():
+    """Close the async Supabase client's pooled sessions (call on app shutdown)"""
+    global _async_supabase_client
+    if _async_supabase_client is None:
+        return
+    
+    client, _async_supabase_client = _async_supabase_client, None
+    await client.postgrest.session.aclose()
+    await client.storage._client.aclose()
+    logger.info("Async Supabase client closed")
+
+
+# Storage bucket for extracted frames; when set, frames are uploaded once and the LLM is sent a
+# short-lived signed URL instead of an inline base64 data URL (~33% larger than the JPEG).
+# Uploaded objects are removed (delete_frame_uploads) as soon as the LLM calls for them finish
+FRAME_STORAGE_BUCKET = os.getenv("FRAME_STORAGE_BUCKET", "")
+FRAME_URL_EXPIRY_SECONDS = int(os.getenv("FRAME_URL_EXPIRY_SECONDS", "3600"))
+# Objects per storage remove request
+FRAME_DELETE_BATCH_SIZE = 1000
+
+
+def _frame_object_path(video_id: str, frame_number: int) -> str:
+    """Object path of an uploaded frame in FRAME_STORAGE_BUCKET"""
+    return f"{video_id}/{frame_number}.jpg"
+
+
+# Optional video_processing counters, only written when the caller provides them
+VIDEO_PROCESSING_COUNTERS = ("total_frames", "processed_frames", "failed_frames")
+
+# Media row cache (video_id -> (fetched_at, row)); create_frame/create_log resolve media per call
+MEDIA_CACHE_TTL_SECONDS = 60
+_media_cache: Dict[str, tuple] = {}
+_media_cache_lock = threading.Lock()
+
+
+def _get_cached_media(video_id: str, video_url: str) -> Optional[Dict[str, Any]]:
+    """Return cached media row if fresh (and, when a URL is given, already has one)"""
+    with _media_cache_lock:
+        hit = _media_cache.get(video_id)
+    if hit is None or time.monotonic() - hit[0] >= MEDIA_CACHE_TTL_SECONDS:
+        return None
+    row = hit[1]
+    # A row created without a URL gets the caller's URL filled in by create_or_get_media
+    if video_url and not row.get("video_url"):
+        return None
+    return row
+
+
+def _cache_media(video_id: str, row: Dict[str, Any]) -> None:
+    """Store media row in cache"""
+    if row.get("id") is None:
+        return
+    with _media_cache_lock:
+        _media_cache[video_id] = (time.monotonic(), row)
+
+
+# Status values (plain strings for hot paths; the enums below compare equal to them)
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
 
 
 # Enums
-class ProcessingStatus(enum.Enum):
-    PENDING = "pending"
-    PROCESSING = "processing"
-    COMPLETED = "completed"
-    FAILED = "failed"
+class ProcessingStatus(str, enum.Enum):
+    PENDING = STATUS_PENDING
+    PROCESSING = STATUS_PROCESSING
+    COMPLETED = STATUS_COMPLETED
+    FAILED = STATUS_FAILED
 
 
-class FrameStatus(enum.Enum):
-    PENDING = "pending"
-    PROCESSING = "processing"
-    COMPLETED = "completed"
-    FAILED = "failed"
+class FrameStatus(str, enum.Enum):
+    PENDING = STATUS_PENDING
+    PROCESSING = STATUS_PROCESSING
+    COMPLETED = STATUS_COMPLETED
+    FAILED = STATUS_FAILED
 
 
 # Database operations using Supabase
 class Database:
-    """Database operations using Supabase client"""
+    """Database operations using async Supabase client"""
     
     @staticmethod
-    def get_client():
-        return get_supabase_client()
+    async def get_client():
+        return await get_async_supabase_client()
     
     # Media operations
     @staticmethod
-    def create_or_get_media(video_id: str, video_url: str, media_type: str = "video") -> Dict[str, Any]:
+    async def create_or_get_media(video_id: str, video_url: str, media_type: str = "video") -> Dict[str, Any]:
         """Create or get media record"""
-        client = get_supabase_client()
+        cached = _get_cached_media(video_id, video_url)
+        if cached is not None:
+            return cached
         
-        # Check if exists
-        result = client.table("media").select("*").eq("video_id", video_id).execute()
+        client = await get_async_supabase_client()
         
-        if result.data:
-            return result.data[0]
-        
-        # Create new
         data = {
             "video_id": video_id,
             "video_url": video_url,
-            "media_type": media_type,
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
+            "media_type": media_type
         }
         
-        result = client.table("media").insert(data).execute()
-        return result.data[0] if result.data else data
+        # Insert if missing; an existing row is left untouched (nothing is returned then)
+        result = await client.table("media").upsert(
+            data, on_conflict="video_id", ignore_duplicates=True
+        ).execute()
+        if result.data:
+            media = result.data[0]
+        else:
+            media = await Database.get_media(video_id)
+            # Only fill in a URL the row doesn't have yet (e.g. created by _get_media_id)
+            if media and video_url and not media.get("video_url"):
+                patched = await client.table("media").update({"video_url": video_url}).eq("id", media["id"]).execute()
+                media = patched.data[0] if patched.data else {**media, "video_url": video_url}
+        
+        if media:
+            _cache_media(video_id, media)
+            return media
+        return data
     
-    # Video Processing operations
     @staticmethod
-    def create_or_get_video_processing(video_id: str, **kwargs) -> Dict[str, Any]:
-        """Create or get video processing record, updating if exists"""
-        client = get_supabase_client()
+    async def _get_media_id(video_id: str) -> Optional[int]:
+        """Get media.id for a video_id (frames/logs reference media.id)"""
+        cached = _get_cached_media(video_id, "")
+        if cached is not None:
+            return cached["id"]
+        
+        media = await Database.get_media(video_id)
+        if media:
+            _cache_media(video_id, media)
+            return media["id"]
+        
+        media = await Database.create_or_get_media(video_id, "")
+        return media.get("id")
+    
+    @staticmethod
+    async def batch_resolve_media(message_ids: List[Any], public_url_prefix: str) -> List[Dict[str, Any]]:
+        """
+        Resolve attachment storage paths and media rows for a batch in one RPC
         
-        result = client.table("video_processing").select("*").eq("video_id", video_id).execute()
+        Creates missing media rows and primes the media cache, so later frame/log
+        writes for these items skip their media lookups.
         
-        if result.data:
-            # Update existing record
-            update_data = {
-                "status": kwargs.get("status", ProcessingStatus.PENDING.value),
-                "granularity_seconds": kwargs.get("granularity_seconds", 1.0),
-                "prompt": kwargs.get("prompt", "What's in this image?"),
-                "model": kwargs.get("model", "google/gemini-2.0-flash-001"),
-                "updated_at": datetime.utcnow().isoformat()
-            }
-            # Only update these if provided
-            if "total_frames" in kwargs:
-                update_data["total_frames"] = kwargs["total_frames"]
-            if "processed_frames" in kwargs:
-                update_data["processed_frames"] = kwargs["processed_frames"]
-            if "failed_frames" in kwargs:
-                update_data["failed_frames"] = kwargs["failed_frames"]
+        Args:
+            message_ids: Attachment message IDs
+            public_url_prefix: Public bucket URL prefix the storage path is appended to
             
-            updated = client.table("video_processing").update(update_data).eq("video_id", video_id).execute()
-            return updated.data[0] if updated.data else result.data[0]
+        Returns:
+            Rows with message_id, storage_path, public_url, media_id, media_type, video_url
+        """
+        client = await get_async_supabase_client()
+        
+        result = await client.rpc(
+            "batch_resolve_media",
+            {"p_ids": [str(message_id) for message_id in message_ids], "p_public_prefix": public_url_prefix}
+        ).execute()
+        rows = result.data or []
+        
+        for row in rows:
+            _cache_media(row["message_id"], {
+                "id": row.get("media_id"),
+                "video_id": row["message_id"],
+                "video_url": row.get("video_url"),
+                "media_type": row.get("media_type")
+            })
+        return rows
+    
+    # Video Processing operations
+    @staticmethod
+    async def create_or_get_video_processing(video_id: str, **kwargs) -> Dict[str, Any]:
+        """Create or get video processing record, updating if exists"""
+        client = await get_async_supabase_client()
         
         data = {
             "video_id": video_id,
-            "status": kwargs.get("status", ProcessingStatus.PENDING.value),
+            "status": kwargs.get("status") or STATUS_PENDING,
             "granularity_seconds": kwargs.get("granularity_seconds", 1.0),
             "prompt": kwargs.get("prompt", "What's in this image?"),
             "model": kwargs.get("model", "google/gemini-2.0-flash-001"),
-            "total_frames": kwargs.get("total_frames", 0),
-            "processed_frames": kwargs.get("processed_frames", 0),
-            "failed_frames": kwargs.get("failed_frames", 0),
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
+            # Only send these if provided (column defaults apply on insert)
+            **{key: kwargs[key] for key in VIDEO_PROCESSING_COUNTERS if key in kwargs}
         }
         
-        result = client.table("video_processing").insert(data).execute()
+        result = await client.table("video_processing").upsert(data, on_conflict="video_id").execute()
         return result.data[0] if result.data else data
     
     @staticmethod
-    def update_video_processing(video_id: str, **kwargs) -> Dict[str, Any]:
+    async def update_video_processing(video_id: str, **kwargs) -> Dict[str, Any]:
         """Update video processing record"""
-        client = get_supabase_client()
-        kwargs["updated_at"] = datetime.utcnow().isoformat()
+        client = await get_async_supabase_client()
         
-        result = client.table("video_processing").update(kwargs).eq("video_id", video_id).execute()
+        result = await client.table("video_processing").update(kwargs).eq("video_id", video_id).execute()
         return result.data[0] if result.data else {}
     
     # Image Processing operations
     @staticmethod
-    def create_image_processing(video_id: str, **kwargs) -> Dict[str, Any]:
+    async def create_image_processing(video_id: str, **kwargs) -> Dict[str, Any]:
         """Create image processing record (allows multiple records per video_id)"""
-        client = get_supabase_client()
+        client = await get_async_supabase_client()
         
         data = {
             "video_id": video_id,
-            "status": kwargs.get("status", ProcessingStatus.COMPLETED.value),
+            "status": kwargs.get("status") or STATUS_COMPLETED,
             "prompt": kwargs.get("prompt", "What's in this image?"),
             "model": kwargs.get("model", "google/gemini-2.0-flash-001"),
-            "llm_response": kwargs.get("llm_response", ""),
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
+            "llm_response": kwargs.get("llm_response", "")
         }
         
-        result = client.table("image_processing").insert(data).execute()
+        result = await client.table("image_processing").insert(data).execute()
         return result.data[0] if result.data else data
     
     @staticmethod
-    def get_image_processing(video_id: str) -> Optional[Dict[str, Any]]:
+    async def get_image_processing(video_id: str, fields: str = IMAGE_PROCESSING_FIELDS) -> Optional[Dict[str, Any]]:
         """Get the most recent image processing record for a video_id"""
-        client = get_supabase_client()
+        client = await get_async_supabase_client()
         
-        result = client.table("image_processing").select("*").eq("video_id", video_id).order("created_at", desc=True).limit(1).execute()
-        return result.data[0] if result.data else None
+        # maybe_single() yields the row or None (newer postgrest returns no response at all)
+        result = await client.table("image_processing").select(fields).eq("video_id", video_id).order("created_at", desc=True).limit(1).maybe_single().execute()
+        return result.data if result else None
     
     @staticmethod
-    def update_image_processing(video_id: str, **kwargs) -> Dict[str, Any]:
+    async def update_image_processing(video_id: str, **kwargs) -> Dict[str, Any]:
         """Update the most recent image processing record for a video_id"""
-        client = get_supabase_client()
-        kwargs["updated_at"] = datetime.utcnow().isoformat()
+        client = await get_async_supabase_client()
         
-        # Get the most recent record
-        result = client.table("image_processing").select("*").eq("video_id", video_id).order("created_at", desc=True).limit(1).execute()
-        
-        if result.data:
-            record_id = result.data[0].get("id")
-            updated = client.table("image_processing").update(kwargs).eq("id", record_id).execute()
-            return updated.data[0] if updated.data else {}
-        return {}
+        # Selects the latest row and updates it in one statement (see migration_image_processing_rpc.sql)
+        result = await client.rpc(
+            "update_latest_image_processing", {"p_video_id": video_id, "p_patch": kwargs}
+        ).execute()
+        return result.data[0] if result.data else {}
+    
+    @staticmethod
+    async def upsert_image_processing(video_id: str, **kwargs) -> Dict[str, Any]:
+        """Update the most recent image processing record for a video_id, creating one if none exists"""
+        client = await get_async_supabase_client()
+        
+        # Update-or-insert in one statement (see migration_upsert_image_processing.sql)
+        result = await client.rpc(
+            "upsert_image_processing", {"p_video_id": video_id, "p_patch": kwargs}
+        ).execute()
+        return result.data[0] if result.data else {}
     
     # Frame operations
     @staticmethod
-    def create_frame(video_id: str, frame_number: int, timestamp_seconds: float, **kwargs) -> Dict[str, Any]:
+    async def create_frame(video_id: str, frame_number: int, timestamp_seconds: float, **kwargs) -> Dict[str, Any]:
         """Create frame record"""
-        client = get_supabase_client()
+        client = await get_async_supabase_client()
         
         # Get media id
-        media = Database.create_or_get_media(video_id, "")
+        media_id = await Database._get_media_id(video_id)
         
         data = {
-            "video_id": media.get("id"),  # Use media.id for foreign key
+            "video_id": media_id,  # Use media.id for foreign key
             "frame_number": frame_number,
             "timestamp_seconds": timestamp_seconds,
-            "status": kwargs.get("status", FrameStatus.PENDING.value),
+            "status": kwargs.get("status") or STATUS_PENDING,
             "llm_response": kwargs.get("llm_response", ""),
-            "error_message": kwargs.get("error_message"),
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
+            "error_message": kwargs.get("error_message")
         }
         
-        result = client.table("frames").insert(data).execute()
+        result = await client.table("frames").insert(data).execute()
         return result.data[0] if result.data else data
     
     @staticmethod
-    def update_frame(frame_id: int, **kwargs) -> Dict[str, Any]:
+    async def create_frames(video_id: str, frames: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Create frame records in one request
+        
+        Args:
+            video_id: Media video_id the frames belong to
+            frames: Dicts with frame_number, timestamp_seconds and optional
+                status, llm_response, error_message, phash
+            
+        Returns:
+            Created frame records
+        """
+        if not frames:
+            return []
+        
+        client = await get_async_supabase_client()
+        media_id = await Database._get_media_id(video_id)
+        
+        rows = [
+            {
+                "video_id": media_id,
+                "frame_number": frame["frame_number"],
+                "timestamp_seconds": frame["timestamp_seconds"],
+                "status": frame.get("status") or STATUS_PENDING,
+                "llm_response": frame.get("llm_response", ""),
+                "error_message": frame.get("error_message")
+            }
+            for frame in frames
+        ]
+        # Bulk upserts need the same keys on every row; phash needs migration_add_frame_phash.sql
+        if any("phash" in frame for frame in frames):
+            for row, frame in zip(rows, frames):
+                row["phash"] = frame.get("phash")
+        
+        # Re-processing a video replaces its frames (UNIQUE(video_id, frame_number))
+        result = await client.table("frames").upsert(rows, on_conflict="video_id,frame_number").execute()
+        return result.data if result.data else rows
+    
+    @staticmethod
+    async def delete_frames_from(video_id: str, first_frame_number: int):
+        """Delete frame records with frame_number >= first_frame_number (trims placeholders and stale frames)"""
+        client = await get_async_supabase_client()
+        media_id = await Database._get_media_id(video_id)
+        
+        await client.table("frames").delete().eq("video_id", media_id).gte("frame_number", first_frame_number).execute()
+    
+    @staticmethod
+    async def upload_frame(video_id: str, frame_number: int, frame_bytes: bytes) -> str:
+        """
+        Upload a JPEG frame to FRAME_STORAGE_BUCKET
+        
+        Args:
+            video_id: Media video_id the frame belongs to
+            frame_number: Frame number (re-uploads overwrite the same object)
+            frame_bytes: JPEG bytes
+            
+        Returns:
+            Signed URL valid for FRAME_URL_EXPIRY_SECONDS; remove the object with
+            delete_frame_uploads once the LLM has read it
+        """
+        client = await get_async_supabase_client()
+        bucket = client.storage.from_(FRAME_STORAGE_BUCKET)
+        path = _frame_object_path(video_id, frame_number)
+        
+        await bucket.upload(path, frame_bytes, {"content-type": "image/jpeg", "upsert": "true"})
+        signed = await bucket.create_signed_url(path, FRAME_URL_EXPIRY_SECONDS)
+        return signed.get("signedURL") or signed["signedUrl"]
+    
+    @staticmethod
+    def upload_frame_sync(video_id: str, frame_number: int, frame_bytes: bytes) -> str:
+        """Blocking upload_frame for worker threads outside an event loop (uses the sync client)"""
+        bucket = get_supabase_client().storage.from_(FRAME_STORAGE_BUCKET)
+        path = _frame_object_path(video_id, frame_number)
+        
+        bucket.upload(path, frame_bytes, {"content-type": "image/jpeg", "upsert": "true"})
+        signed = bucket.create_signed_url(path, FRAME_URL_EXPIRY_SECONDS)
+        return signed.get("signedURL") or signed["signedUrl"]
+    
+    @staticmethod
+    async def delete_frame_uploads(video_id: str, frame_numbers: List[int]):
+        """
+        Remove uploaded frames from FRAME_STORAGE_BUCKET (the signed URL expiring doesn't)
+        
+        Failures are logged, not raised: a leftover object only costs storage.
+        """
+        if not FRAME_STORAGE_BUCKET or not frame_numbers:
+            return
+        client = await get_async_supabase_client()
+        bucket = client.storage.from_(FRAME_STORAGE_BUCKET)
+        paths = [_frame_object_path(video_id, frame_number) for frame_number in frame_numbers]
+        for start in range(0, len(paths), FRAME_DELETE_BATCH_SIZE):
+            try:
+                await bucket.remove(paths[start:start + FRAME_DELETE_BATCH_SIZE])
+            except Exception as e:
+                logger.warning(f"Could not remove uploaded frames for {video_id}: {str(e)}")
+    
+    @staticmethod
+    def delete_frame_uploads_sync(video_id: str, frame_numbers: List[int]):
+        """Blocking delete_frame_uploads for worker threads outside an event loop (uses the sync client)"""
+        if not FRAME_STORAGE_BUCKET or not frame_numbers:
+            return
+        bucket = get_supabase_client().storage.from_(FRAME_STORAGE_BUCKET)
+        paths = [_frame_object_path(video_id, frame_number) for frame_number in frame_numbers]
+        for start in range(0, len(paths), FRAME_DELETE_BATCH_SIZE):
+            try:
+                bucket.remove(paths[start:start + FRAME_DELETE_BATCH_SIZE])
+            except Exception as e:
+                logger.warning(f"Could not remove uploaded frames for {video_id}: {str(e)}")
+    
+    @staticmethod
+    async def update_frame(frame_id: int, **kwargs) -> Dict[str, Any]:
         """Update frame record"""
-        client = get_supabase_client()
-        kwargs["updated_at"] = datetime.utcnow().isoformat()
+        client = await get_async_supabase_client()
         
-        result = client.table("frames").update(kwargs).eq("id", frame_id).execute()
+        result = await client.table("frames").update(kwargs).eq("id", frame_id).execute()
         return result.data[0] if result.data else {}
     
     @staticmethod
-    def get_frames(video_id: str) -> List[Dict[str, Any]]:
+    async def get_frames(video_id: str, fields: str = FRAME_FIELDS) -> List[Dict[str, Any]]:
         """Get all frames for a video"""
-        client = get_supabase_client()
-        media = Database.create_or_get_media(video_id, "")
+        client = await get_async_supabase_client()
+        media_id = await Database._get_media_id(video_id)
         
-        result = client.table("frames").select("*").eq("video_id", media.get("id")).order("frame_number").execute()
+        result = await client.table("frames").select(fields).eq("video_id", media_id).order("frame_number").execute()
         return result.data if result.data else []
     
     # Scene Index operations
     @staticmethod
-    def create_scene_index(video_id: str, video_db_id: str, index_id: str, **kwargs) -> Dict[str, Any]:
+    async def create_scene_index(video_id: str, video_db_id: str, index_id: str, **kwargs) -> Dict[str, Any]:
         """Create scene index record"""
-        client = get_supabase_client()
+        client = await get_async_supabase_client()
         
         data = {
             "video_id": video_id,
@@ -233,107 +545,122 @@ class Database:
             "index_id": index_id,
             "extraction_type": kwargs.get("extraction_type", "shot_based"),
             "prompt": kwargs.get("prompt"),
-            "status": kwargs.get("status", ProcessingStatus.PENDING.value),
+            "status": kwargs.get("status") or STATUS_PENDING,
             "scene_count": kwargs.get("scene_count", 0),
-            "scenes_data": kwargs.get("scenes_data"),
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
+            "scenes_data": kwargs.get("scenes_data")
         }
         
-        result = client.table("scene_indexes").insert(data).execute()
+        result = await client.table("scene_indexes").insert(data).execute()
         return result.data[0] if result.data else data
     
     @staticmethod
-    def update_scene_index(video_id: str, index_id: str, **kwargs) -> Dict[str, Any]:
+    async def update_scene_index(video_id: str, index_id: str, **kwargs) -> Dict[str, Any]:
         """Update scene index record"""
-        client = get_supabase_client()
-        kwargs["updated_at"] = datetime.utcnow().isoformat()
+        client = await get_async_supabase_client()
         
-        result = client.table("scene_indexes").update(kwargs).eq("video_id", video_id).eq("index_id", index_id).execute()
+        result = await client.table("scene_indexes").update(kwargs).eq("video_id", video_id).eq("index_id", index_id).execute()
         return result.data[0] if result.data else {}
     
     @staticmethod
-    def get_scene_index(video_id: str, index_id: str) -> Optional[Dict[str, Any]]:
-        """Get scene index record"""
-        client = get_supabase_client()
+    async def get_scene_index(video_id: str, index_id: str, fields: str = SCENE_INDEX_FIELDS) -> Optional[Dict[str, Any]]:
+        """Get scene index record (pass fields="*" to include scenes_data)"""
+        client = await get_async_supabase_client()
         
-        result = client.table("scene_indexes").select("*").eq("video_id", video_id).eq("index_id", index_id).execute()
-        return result.data[0] if result.data else None
+        result = await client.table("scene_indexes").select(fields).eq("video_id", video_id).eq("index_id", index_id).maybe_single().execute()
+        return result.data if result else None
     
     # Transcription operations
     @staticmethod
-    def create_transcription(video_id: str, video_db_id: str, **kwargs) -> Dict[str, Any]:
+    async def create_transcription(video_id: str, video_db_id: str, **kwargs) -> Dict[str, Any]:
         """Create transcription record"""
-        client = get_supabase_client()
+        client = await get_async_supabase_client()
         
         data = {
             "video_id": video_id,
             "video_db_id": video_db_id,
             "language_code": kwargs.get("language_code"),
-            "status": kwargs.get("status", ProcessingStatus.PENDING.value),
+            "status": kwargs.get("status") or STATUS_PENDING,
             "transcript_data": kwargs.get("transcript_data"),
             "transcript_text": kwargs.get("transcript_text"),
-            "segment_count": kwargs.get("segment_count", 0),
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
+            "segment_count": kwargs.get("segment_count", 0)
         }
         
-        result = client.table("transcriptions").insert(data).execute()
+        result = await client.table("transcriptions").insert(data).execute()
         return result.data[0] if result.data else data
     
     @staticmethod
-    def update_transcription(video_id: str, **kwargs) -> Dict[str, Any]:
+    async def update_transcription(video_id: str, **kwargs) -> Dict[str, Any]:
         """Update transcription record"""
-        client = get_supabase_client()
-        kwargs["updated_at"] = datetime.utcnow().isoformat()
+        client = await get_async_supabase_client()
         
-        result = client.table("transcriptions").update(kwargs).eq("video_id", video_id).execute()
+        result = await client.table("transcriptions").update(kwargs).eq("video_id", video_id).execute()
         return result.data[0] if result.data else {}
     
     @staticmethod
-    def get_transcription(video_id: str) -> Optional[Dict[str, Any]]:
-        """Get transcription record"""
-        client = get_supabase_client()
+    async def get_transcription(video_id: str, fields: str = TRANSCRIPTION_FIELDS) -> Optional[Dict[str, Any]]:
+        """Get transcription record (pass fields="*" to include transcript_data/transcript_text)"""
+        client = await get_async_supabase_client()
         
-        result = client.table("transcriptions").select("*").eq("video_id", video_id).execute()
-        return result.data[0] if result.data else None
+        result = await client.table("transcriptions").select(fields).eq("video_id", video_id).maybe_single().execute()
+        return result.data if result else None
     
     # Processing Log operations
     @staticmethod
-    def create_log(video_id: str, frame_id: Optional[int], level: str, message: str) -> Dict[str, Any]:
+    async def create_log(video_id: str, frame_id: Optional[int], level: str, message: str) -> Dict[str, Any]:
         """Create processing log"""
-        client = get_supabase_client()
+        client = await get_async_supabase_client()
         
         # Get media id
-        media = Database.create_or_get_media(video_id, "")
+        media_id = await Database._get_media_id(video_id)
         
         data = {
-            "video_id": media.get("id"),
+            "video_id": media_id,
             "frame_id": frame_id,
             "level": level,
-            "message": message,
-            "created_at": datetime.utcnow().isoformat()
+            "message": message
         }
         
-        result = client.table("processing_logs").insert(data).execute()
+        result = await client.table("processing_logs").insert(data).execute()
         return result.data[0] if result.data else data
     
+    @staticmethod
+    async def create_logs(video_id: str, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create processing logs in one request (dicts with frame_id, level, message)"""
+        if not logs:
+            return []
+        
+        client = await get_async_supabase_client()
+        media_id = await Database._get_media_id(video_id)
+        
+        rows = [
+            {
+                "video_id": media_id,
+                "frame_id": log.get("frame_id"),
+                "level": log["level"],
+                "message": log["message"]
+            }
+            for log in logs
+        ]
+        
+        result = await client.table("processing_logs").insert(rows).execute()
+        return result.data if result.data else rows
+    
     # Query operations
     @staticmethod
-    def get_video_processing(video_id: str) -> Optional[Dict[str, Any]]:
+    async def get_video_processing(video_id: str, fields: str = VIDEO_PROCESSING_FIELDS) -> Optional[Dict[str, Any]]:
         """Get video processing record"""
-        client = get_supabase_client()
+        client = await get_async_supabase_client()
         
-        result = client.table("video_processing").select("*").eq("video_id", video_id).execute()
-        return result.data[0] if result.data else None
+        result = await client.table("video_processing").select(fields).eq("video_id", video_id).maybe_single().execute()
+        return result.data if result else None
     
     @staticmethod
-    def get_media(video_id: str) -> Optional[Dict[str, Any]]:
+    async def get_media(video_id: str, fields: str = MEDIA_FIELDS) -> Optional[Dict[str, Any]]:
         """Get media record"""
-        client = get_supabase_client()
+        client = await get_async_supabase_client()
         
-        result = client.table("media").select("*").eq("video_id", video_id).execute()
-        return result.data[0] if result.data else None
+        result = await client.table("media").select(fields).eq("video_id", video_id).maybe_single().execute()
+        return result.data if result else None
 
 
 # Initialize Supabase on import
@@ -348,12 +675,24 @@ def init_db():
         return False
 
 
+async def init_async_db():
+    """Initialize async Supabase client"""
+    try:
+        await get_async_supabase_client()
+        return True
+    except Exception as e:
+        logger.error(f"Failed to initialize async database client: {e}")
+        return False
+
+
 # Backward compatibility aliases
 get_db_session = get_supabase_client
-Media = type('Media', (), {'__getitem__': lambda self, key: None})  # Dummy class for compatibility
-Video = type('Video', (), {'__getitem__': lambda self, key: None})
-Frame = type('Frame', (), {'__getitem__': lambda self, key: None})
-SceneIndex = type('SceneIndex', (), {'__getitem__': lambda self, key: None})
-Transcription = type('Transcription', (), {'__getitem__': lambda self, key: None})
-VideoProcessing = type('VideoProcessing', (), {'__getitem__': lambda self, key: None})
-ImageProcessing = type('ImageProcessing', (), {'__getitem__': lambda self, key: None})
+
+
+class _LegacyRow:
+    """Placeholder for the removed SQLAlchemy models (kept for old imports)"""
+    def __getitem__(self, key):
+        return None
+
+
+Media = Video = Frame = SceneIndex = Transcription = VideoProcessing = ImageProcessing = _LegacyRow
@@ -2,60 +2,84 @@
 Batch processing endpoint - processes multiple media items concurrently
 """
 from fastapi import HTTPException, UploadFile
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, MutableMapping
 import logging
+import os
 import asyncio
+import functools
 from urllib.parse import urlparse
 import mimetypes
 from ..models import VideoProcessRequest, SceneIndexRequest, TranscriptionRequest
-from ..database import get_supabase_client
+from ..database import Database, get_async_supabase_client
 from ..video_index import VideoIndex
 from ..video_processor import VideoProcessor
 from ..scene_indexer import SceneIndexer
+from ..llm_batcher import LLMBatcher
 from .image import process_image_endpoint
 from .video import process_video_endpoint
-from .scene import scene_index_endpoint
-from .transcription import transcription_endpoint
+from .scene import run_scene_index
+from .transcription import run_transcription
+from .videodb_upload import ensure_uploaded
 
 logger = logging.getLogger(__name__)
 
+# Bound in-flight work across the whole batch so large batches don't exhaust
+# upstream LLM rate limits or the Supabase connection pool. Video frame pipelines
+# (download, decode, upload and up to FRAME_CONCURRENCY LLM calls each, often for
+# minutes) get their own semaphore so long videos don't starve the image items.
+LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "32"))
+VIDEO_CONCURRENCY = int(os.getenv("BATCH_VIDEO_CONCURRENCY", "4"))
+VIDEODB_CONCURRENCY = int(os.getenv("BATCH_VIDEODB_CONCURRENCY", "10"))
+_llm_semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+_video_semaphore = asyncio.Semaphore(VIDEO_CONCURRENCY)
+_videodb_semaphore = asyncio.Semaphore(VIDEODB_CONCURRENCY)
 
+# Public bucket URLs are deterministic: batch_resolve_media appends the storage path
+# to this prefix. Set SUPABASE_PUBLIC_BUCKET=false to resolve URLs through the storage client instead.
+STORAGE_BUCKET = "videos"
+USE_PUBLIC_BUCKET_URLS = os.getenv("SUPABASE_PUBLIC_BUCKET", "true").lower() != "false"
+_PUBLIC_URL_PREFIX = f"{(os.getenv('SUPABASE_URL') or '').rstrip('/')}/storage/v1/object/public/{STORAGE_BUCKET}/"
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.svg')
+
+# Load the MIME type map once at import instead of on the first request
+mimetypes.init()
+
+
+@functools.lru_cache(maxsize=4096)
 def is_image_url(url: str) -> bool:
     """Determine if URL points to an image based on extension or content type"""
-    url_lower = url.lower()
-    image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.svg'}
-    
     # Check file extension
-    parsed = urlparse(url_lower)
-    path = parsed.path
-    if any(path.endswith(ext) for ext in image_extensions):
+    path = urlparse(url.lower()).path
+    if path.endswith(IMAGE_EXTENSIONS):
         return True
     
     # Check MIME type if available
     mime_type, _ = mimetypes.guess_type(url)
-    if mime_type and mime_type.startswith('image/'):
-        return True
-    
-    return False
+    return bool(mime_type and mime_type.startswith('image/'))
 
 
 async def process_image_item(
     video_index: VideoIndex,
     file_id: str,
     image_url: str,
+    llm_batcher: Optional[LLMBatcher] = None,
     prompt: str = "What's in this image?",
     model: str = "google/gemini-2.0-flash-001"
 ) -> Dict[str, Any]:
     """Process a single image item"""
     try:
-        result = await process_image_endpoint(
-            video_index=video_index,
-            file_id=file_id,
-            image=None,
-            image_url=image_url,
-            prompt=prompt,
-            model=model
-        )
+        async with _llm_semaphore:
+            result = await process_image_endpoint(
+                video_index=video_index,
+                file_id=file_id,
+                image=None,
+                image_url=image_url,
+                prompt=prompt,
+                model=model,
+                llm_batcher=llm_batcher
+            )
         return {
             "file_id": file_id,
             "type": "image",
@@ -76,9 +100,10 @@ async def process_video_item(
     video_processor: VideoProcessor,
     video_index: VideoIndex,
     scene_indexer: Optional[SceneIndexer],
-    video_file_cache: Dict[str, Any],
+    video_file_cache: MutableMapping[str, Any],
     video_id: str,
     video_url: str,
+    llm_batcher: Optional[LLMBatcher] = None,
     granularity_seconds: float = 1.0,
     prompt: str = "What's in this image?",
     model: str = "google/gemini-2.0-flash-001",
@@ -87,7 +112,7 @@ async def process_video_item(
     threshold: int = 20,
     frame_count: int = 5
 ) -> Dict[str, Any]:
-    """Process a single video item through all 3 video endpoints concurrently"""
+    """Process a single video item through all 3 video pipelines concurrently (videodb upload shared)"""
     results = {
         "video_id": video_id,
         "type": "video",
@@ -105,66 +130,79 @@ async def process_video_item(
                 prompt=prompt,
                 model=model
             )
-            result = await process_video_endpoint(
-                video_processor=video_processor,
-                video_index=video_index,
-                request=request
-            )
+            async with _video_semaphore:
+                result = await process_video_endpoint(
+                    video_processor=video_processor,
+                    video_index=video_index,
+                    request=request,
+                    llm_batcher=llm_batcher
+                )
             return {"status": "success", "result": result}
         except Exception as e:
             logger.error(f"Error processing video frames for {video_id}: {str(e)}")
             return {"status": "error", "error": str(e)}
     
-    async def process_scene_index():
-        """Process scene indexing"""
+    async def process_videodb():
+        """Upload to videodb once, then run scene indexing and transcription concurrently"""
         if scene_indexer is None:
-            return {"status": "skipped", "error": "Scene indexing not available"}
-        try:
-            request = SceneIndexRequest(
-                video_id=video_id,
-                video_url=video_url,
-                extraction_type=extraction_type,
-                prompt=scene_prompt,
-                threshold=threshold,
-                frame_count=frame_count
-            )
-            result = await scene_index_endpoint(
-                scene_indexer=scene_indexer,
-                video_file_cache=video_file_cache,
-                request=request
+            return (
+                {"status": "skipped", "error": "Scene indexing not available"},
+                {"status": "skipped", "error": "Transcription not available"}
             )
-            return {"status": "success", "result": result}
-        except Exception as e:
-            logger.error(f"Error processing scene index for {video_id}: {str(e)}")
-            return {"status": "error", "error": str(e)}
-    
-    async def process_transcription():
-        """Process transcription"""
-        if scene_indexer is None:
-            return {"status": "skipped", "error": "Transcription not available"}
         try:
-            request = TranscriptionRequest(
-                video_id=video_id,
-                video_url=video_url
-            )
-            result = await transcription_endpoint(
-                scene_indexer=scene_indexer,
-                video_file_cache=video_file_cache,
-                request=request
-            )
-            return {"status": "success", "result": result}
+            async with _videodb_semaphore:
+                await Database.create_or_get_media(video_id, video_url, "video")
+                video_file = await ensure_uploaded(scene_indexer, video_file_cache, video_url)
         except Exception as e:
-            logger.error(f"Error processing transcription for {video_id}: {str(e)}")
-            return {"status": "error", "error": str(e)}
+            logger.error(f"Error uploading {video_id} to videodb: {str(e)}")
+            error = {"status": "error", "error": str(e)}
+            return error, dict(error)
+        
+        async def process_scene_index():
+            """Process scene indexing"""
+            try:
+                request = SceneIndexRequest(
+                    video_id=video_id,
+                    video_url=video_url,
+                    extraction_type=extraction_type,
+                    prompt=scene_prompt,
+                    threshold=threshold,
+                    frame_count=frame_count
+                )
+                async with _videodb_semaphore:
+                    result = await run_scene_index(scene_indexer, video_file, request)
+                return {"status": "success", "result": result}
+            except Exception as e:
+                logger.error(f"Error processing scene index for {video_id}: {str(e)}")
+                return {"status": "error", "error": str(e)}
+        
+        async def process_transcription():
+            """Process transcription"""
+            try:
+                request = TranscriptionRequest(
+                    video_id=video_id,
+                    video_url=video_url
+                )
+                async with _videodb_semaphore:
+                    result = await run_transcription(scene_indexer, video_file, request)
+                return {"status": "success", "result": result}
+            except Exception as e:
+                logger.error(f"Error processing transcription for {video_id}: {str(e)}")
+                return {"status": "error", "error": str(e)}
+        
+        return await asyncio.gather(process_scene_index(), process_transcription())
     
-    # Run all 3 video processing tasks concurrently
+    # Run frame processing and the videodb pipeline (one upload, then scenes + transcript) concurrently
     try:
-        frame_result, scene_result, transcript_result = await asyncio.gather(
+        frame_result, videodb_result = await asyncio.gather(
             process_video_frames(),
-            process_scene_index(),
-            process_transcription(),
+            process_videodb(),
             return_exceptions=True
         )
+        if isinstance(videodb_result, Exception):
+            scene_result = transcript_result = videodb_result
+        else:
+            scene_result, transcript_result = videodb_result
         
         results["results"]["video_frames"] = frame_result if not isinstance(frame_result, Exception) else {"status": "error", "error": str(frame_result)}
         results["results"]["scene_index"] = scene_result if not isinstance(scene_result, Exception) else {"status": "error", "error": str(scene_result)}
@@ -185,12 +223,21 @@ async def process_video_item(
     return results
 
 
+async def _capture_exception(coro) -> Any:
+    """Await coro, returning any exception instead of raising (keeps sibling tasks running)"""
+    try:
+        return await coro
+    except Exception as e:
+        return e
+
+
 async def batch_process_endpoint(
     video_index: VideoIndex,
     video_processor: VideoProcessor,
     scene_indexer: Optional[SceneIndexer],
-    video_file_cache: Dict[str, Any],
-    media_items: List[Dict[str, str]],
+    video_file_cache: MutableMapping[str, Any],
+    media_items: List[str],
+    llm_batcher: Optional[LLMBatcher] = None,
     frame_prompt: str = "What's in this image?",
     model: str = "google/gemini-2.0-flash-001",
     granularity_seconds: float = 1.0,
@@ -207,7 +254,8 @@ async def batch_process_endpoint(
         video_processor: VideoProcessor instance
         scene_indexer: SceneIndexer instance (optional)
         video_file_cache: Cache for video file objects
-        media_items: List of dicts with "video_id" and "video_url" keys
+        media_items: List of media IDs (attachment message IDs)
+        llm_batcher: Optional LLMBatcher shared by image and video frame processing
         prompt: Prompt for image/video frame processing
         model: Model to use for LLM processing
         granularity_seconds: Granularity for video frame extraction
@@ -219,76 +267,73 @@ async def batch_process_endpoint(
     Returns:
         Dictionary with results for all processed items
     """
-    tasks = []
-    supabase_client = get_supabase_client()
-
-    # ensure unique media_items
-    media_items = list(set(media_items))
+    # ensure unique media_items (first-seen order preserved)
+    media_items = list(dict.fromkeys(media_items))
+    item_ids = [item for item in media_items if item]
     
-    for item in media_items:
-        # Get media_id from item (could be video_id, file_id, or media_id)
-        media_id = item
-        
-        if not media_id:
-            logger.warning(f"Skipping item with missing media_id: {item}")
-            continue
-        
-        # Get storage_path from attachments table
-        try:
-            
-            attachments_result = supabase_client.table("attachments").select("storage_path").eq("message_id", media_id).execute()
-            
-            if not attachments_result.data or len(attachments_result.data) == 0:
-                logger.warning(f"No attachment found for media_id: {media_id}")
-                continue
-            
-            media_path = attachments_result.data[0].get("storage_path")
-            if not media_path:
-                logger.warning(f"No storage_path found for media_id: {media_id}")
+    # Phase 1: resolve storage paths, public URLs and media rows for all items in one RPC
+    try:
+        resolved_rows = await Database.batch_resolve_media(item_ids, _PUBLIC_URL_PREFIX)
+        resolved_by_id = {row["message_id"]: row for row in resolved_rows if row.get("storage_path")}
+    except Exception as e:
+        logger.error(f"Error resolving media items: {str(e)}")
+        resolved_by_id = {}
+    
+    missing = [item for item in media_items if not item or item not in resolved_by_id]
+    if missing:
+        logger.warning(f"No attachment/storage_path found for {len(missing)} media item(s): {missing}")
+    
+    if USE_PUBLIC_BUCKET_URLS:
+        resolved = [(media_id, resolved_by_id[media_id]["public_url"]) for media_id in item_ids if media_id in resolved_by_id]
+    else:
+        supabase_client = await get_async_supabase_client()
+        bucket = supabase_client.storage.from_(STORAGE_BUCKET)
+        resolved = []
+        for media_id in item_ids:
+            if media_id not in resolved_by_id:
                 continue
-            
-            # Get public URL from Supabase storage
-            media_s3_path = supabase_client.storage.from_("videos").get_public_url(media_path)
-        except Exception as e:
-            logger.error(f"Error fetching media path for {media_id}: {str(e)}")
-            continue
-        
-        # Use media_id as the identifier
-        video_id = media_id
-        
-        # Determine if it's an image or video
+            try:
+                resolved.append((media_id, await bucket.get_public_url(resolved_by_id[media_id]["storage_path"])))
+            except Exception as e:
+                logger.error(f"Error fetching media path for {media_id}: {str(e)}")
+    
+    # Phase 2: build one task per item (media_id is used as the video/file identifier)
+    def build_task(video_id: str, media_s3_path: str):
         if is_image_url(media_s3_path):
             # Process as image
-            task = process_image_item(
+            return process_image_item(
                 video_index=video_index,
                 file_id=video_id,
                 image_url=media_s3_path,
+                llm_batcher=llm_batcher,
                 prompt=frame_prompt,
                 model=model
             )
-        else:
-            # Process as video (all 3 endpoints)
-            task = process_video_item(
-                video_processor=video_processor,
-                video_index=video_index,
-                scene_indexer=scene_indexer,
-                video_file_cache=video_file_cache,
-                video_id=video_id,
-                video_url=media_s3_path,
-                granularity_seconds=granularity_seconds,
-                prompt=frame_prompt,
-                model=model,
-                extraction_type=extraction_type,
-                scene_prompt=scene_prompt,
-                threshold=threshold,
-                frame_count=frame_count
-            )
-        
-        tasks.append(task)
+        # Process as video (all 3 endpoints)
+        return process_video_item(
+            video_processor=video_processor,
+            video_index=video_index,
+            scene_indexer=scene_indexer,
+            video_file_cache=video_file_cache,
+            video_id=video_id,
+            video_url=media_s3_path,
+            llm_batcher=llm_batcher,
+            granularity_seconds=granularity_seconds,
+            prompt=frame_prompt,
+            model=model,
+            extraction_type=extraction_type,
+            scene_prompt=scene_prompt,
+            threshold=threshold,
+            frame_count=frame_count
+        )
+    
+    tasks = [build_task(video_id, media_s3_path) for video_id, media_s3_path in resolved]
     
-    # Process all items concurrently
+    # Process all items concurrently (bounded by the semaphores above)
     logger.info(f"Processing {len(tasks)} media items concurrently...")
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    async with asyncio.TaskGroup() as tg:
+        handles = [tg.create_task(_capture_exception(task)) for task in tasks]
+    results = [handle.result() for handle in handles]
     
     # Format results
     processed_results = []
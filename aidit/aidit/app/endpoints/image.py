@@ -5,21 +5,38 @@ from fastapi import HTTPException, UploadFile, File
 from typing import Optional, Dict, Any
 import logging
 import os
+import asyncio
+from pathlib import Path
 
-from ..database import Database, ProcessingStatus
+from ..database import Database, STATUS_COMPLETED
 from ..video_index import VideoIndex
+from ..llm_batcher import LLMBatcher
 from ..utils import encode_image_to_base64
 
 logger = logging.getLogger(__name__)
 
 
+async def _run_llm(
+    video_index: VideoIndex,
+    llm_batcher: Optional[LLMBatcher],
+    image: str,
+    prompt: Optional[str]
+) -> Dict[str, Any]:
+    """Send an image URL/data URL to the LLM through the shared batcher, or a worker thread without one"""
+    prompt = prompt or "What's in this image?"
+    if llm_batcher is not None:
+        return await llm_batcher.process(image, prompt)
+    return await asyncio.to_thread(video_index.process_image_from_url, video_index.to_image_url(image), prompt)
+
+
 async def process_image_endpoint(
     video_index: VideoIndex,
     file_id: str,
     image: Optional[UploadFile] = File(None),
     image_url: Optional[str] = None,
     prompt: Optional[str] = "What's in this image?",
-    model: Optional[str] = "google/gemini-2.0-flash-001"
+    model: Optional[str] = "google/gemini-2.0-flash-001",
+    llm_batcher: Optional[LLMBatcher] = None
 ) -> Dict[str, Any]:
     """
     Process a single image from URL or file upload
@@ -33,6 +50,7 @@ async def process_image_endpoint(
         image_url: URL of image to process (optional) - sent directly to LLM
         prompt: Prompt/question to ask about the image
         model: Model to use
+        llm_batcher: Optional LLMBatcher; without one the LLM call runs in a worker thread
         
     Returns:
         Dictionary with response and processing information
@@ -42,12 +60,11 @@ async def process_image_endpoint(
         if image:
             logger.info(f"Processing uploaded image file: {image.filename}")
             image_bytes = await image.read()
-            base64_image = encode_image_to_base64(image_bytes)
+            # Encode off the event loop and drop the raw bytes so only the base64 copy is held
+            base64_image = await asyncio.to_thread(encode_image_to_base64, image_bytes, image.content_type)
+            del image_bytes
             
-            result = video_index.process_image_from_base64(
-                base64_image,
-                prompt or "What's in this image?"
-            )
+            result = await _run_llm(video_index, llm_batcher, base64_image, prompt)
             source = f"file:{image.filename}"
             media_url = f"uploaded:{image.filename}"
         
@@ -59,10 +76,7 @@ async def process_image_endpoint(
             if is_url:
                 # It's a real URL, send directly to LLM
                 logger.info(f"Processing image from URL: {image_url}")
-                result = video_index.process_image_from_url(
-                    image_url,
-                    prompt or "What's in this image?"
-                )
+                result = await _run_llm(video_index, llm_batcher, image_url, prompt)
                 source = f"url:{image_url}"
                 media_url = image_url
             else:
@@ -71,16 +85,12 @@ async def process_image_endpoint(
                 if not os.path.exists(image_url):
                     raise HTTPException(status_code=404, detail=f"Image file not found: {image_url}")
                 
-                # Read file and convert to base64
-                with open(image_url, "rb") as f:
-                    image_bytes = f.read()
-                
-                base64_image = encode_image_to_base64(image_bytes)
+                # Read file and convert to base64 off the event loop
+                image_bytes = await asyncio.to_thread(Path(image_url).read_bytes)
+                base64_image = await asyncio.to_thread(encode_image_to_base64, image_bytes)
+                del image_bytes
                 
-                result = video_index.process_image_from_base64(
-                    base64_image,
-                    prompt or "What's in this image?"
-                )
+                result = await _run_llm(video_index, llm_batcher, base64_image, prompt)
                 source = f"path:{image_url}"
                 media_url = image_url
         
@@ -88,26 +98,16 @@ async def process_image_endpoint(
             raise HTTPException(status_code=400, detail="Either image file or image_url must be provided")
         
         # Save to database
-        Database.create_or_get_media(file_id, media_url, "image")
+        await Database.create_or_get_media(file_id, media_url, "image")
         
-        # Check if image processing exists, update most recent or create new
-        existing = Database.get_image_processing(file_id)
-        if existing:
-            Database.update_image_processing(
-                video_id=file_id,
-                prompt=prompt or "What's in this image?",
-                model=model,
-                llm_response=result.get("response", ""),
-                status=ProcessingStatus.COMPLETED.value
-            )
-        else:
-            Database.create_image_processing(
-                video_id=file_id,
-                prompt=prompt or "What's in this image?",
-                model=model,
-                llm_response=result.get("response", ""),
-                status=ProcessingStatus.COMPLETED.value
-            )
+        # Update most recent image processing record or create a new one (single round-trip)
+        await Database.upsert_image_processing(
+            video_id=file_id,
+            prompt=prompt or "What's in this image?",
+            model=model,
+            llm_response=result.get("response", ""),
+            status=STATUS_COMPLETED
+        )
         
         return {
             "success": True,
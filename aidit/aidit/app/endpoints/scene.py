@@ -2,21 +2,22 @@
 Scene indexing endpoint
 """
 from fastapi import HTTPException
-from typing import Dict, Any
+from typing import Dict, Any, MutableMapping
 import logging
 import asyncio
-import json
+import orjson
 
-from ..database import Database, ProcessingStatus
+from ..database import Database, STATUS_COMPLETED, STATUS_FAILED, STATUS_PROCESSING
 from ..scene_indexer import SceneIndexer
 from ..models import SceneIndexRequest
+from .videodb_upload import ensure_uploaded
 
 logger = logging.getLogger(__name__)
 
 
 async def scene_index_endpoint(
     scene_indexer: SceneIndexer,
-    video_file_cache: Dict[str, Any],
+    video_file_cache: MutableMapping[str, Any],
     request: SceneIndexRequest
 ) -> Dict[str, Any]:
     """
@@ -38,42 +39,40 @@ async def scene_index_endpoint(
     
     try:
         video_id = request.video_id
-        video_url = str(request.video_url)
+        video_url = request.video_url
         logger.info(f"Uploading video for scene indexing: {video_url} (ID: {video_id})")
         
         # Create media record
-        Database.create_or_get_media(video_id, video_url, "video")
+        await Database.create_or_get_media(video_id, video_url, "video")
         
-        # Upload video to videodb
-        logger.info("Uploading video to videodb...")
-        video_file = scene_indexer.upload_video(video_url)
+        # Upload video to videodb (shared with concurrent requests for the same URL) and wait until ready
+        video_file = await ensure_uploaded(scene_indexer, video_file_cache, video_url)
         
-        # Store video file object in cache
-        video_file_cache[video_file.id] = video_file
-        
-        # Wait for upload with non-blocking status check
-        logger.info("Waiting for video upload to complete...")
-        max_wait_time = 300  # 5 minutes max
-        wait_interval = 2  # Check every 2 seconds
-        elapsed = 0
-        
-        while elapsed < max_wait_time:
-            # Check upload status (non-blocking)
-            try:
-                # videodb upload is typically synchronous, but we check status
-                if hasattr(video_file, 'status'):
-                    status = video_file.status
-                    if status == 'ready' or status == 'completed':
-                        break
-                else:
-                    # Assume ready if no status attribute
-                    break
-            except Exception as e:
-                logger.warning(f"Error checking upload status: {str(e)}")
-            
-            await asyncio.sleep(wait_interval)
-            elapsed += wait_interval
+    except Exception as e:
+        logger.error(f"Error in scene indexing: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    
+    return await run_scene_index(scene_indexer, video_file, request)
+
+
+async def run_scene_index(
+    scene_indexer: SceneIndexer,
+    video_file: Any,
+    request: SceneIndexRequest
+) -> Dict[str, Any]:
+    """
+    Scene index an already uploaded videodb video and save the results
+    
+    Args:
+        scene_indexer: SceneIndexer instance
+        video_file: Ready video file object from videodb
+        request: SceneIndexRequest with video_id, extraction_type, prompt, etc.
         
+    Returns:
+        Dictionary with video_id, index_id, status, and scene data
+    """
+    video_id = request.video_id
+    try:
         logger.info("Video upload completed, starting scene indexing...")
         
         # Build extraction config
@@ -84,8 +83,9 @@ async def scene_index_endpoint(
                 "frame_count": request.frame_count or 5
             }
         
-        # Start scene indexing
-        index_id = scene_indexer.index_scenes(
+        # Start scene indexing (blocking SDK call, run in a thread)
+        index_id = await asyncio.to_thread(
+            scene_indexer.index_scenes,
             video_file_obj=video_file,
             extraction_type=request.extraction_type,
             extraction_config=extraction_config,
@@ -93,26 +93,26 @@ async def scene_index_endpoint(
         )
         
         # Save initial status
-        Database.create_scene_index(
+        await Database.create_scene_index(
             video_id=video_id,
             video_db_id=video_file.id,
             index_id=index_id,
             extraction_type=request.extraction_type,
             prompt=request.prompt,
-            status=ProcessingStatus.PROCESSING.value
+            status=STATUS_PROCESSING
         )
         
         # Poll for results (get_scene_index waits for completion)
         logger.info("Polling for scene index results...")
-        scenes = scene_indexer.get_scene_index(video_file, index_id)
+        scenes = await asyncio.to_thread(scene_indexer.get_scene_index, video_file, index_id)
         
         # Save results to database
-        Database.update_scene_index(
+        await Database.update_scene_index(
             video_id=video_id,
             index_id=index_id,
-            status=ProcessingStatus.COMPLETED.value,
+            status=STATUS_COMPLETED,
             scene_count=len(scenes),
-            scenes_data=json.dumps(scenes)
+            scenes_data=orjson.dumps(scenes).decode()
         )
         
         logger.info(f"Scene indexing completed. Found {len(scenes)} scenes.")
@@ -129,11 +129,10 @@ async def scene_index_endpoint(
     except Exception as e:
         logger.error(f"Error in scene indexing: {str(e)}")
         if 'index_id' in locals():
-            Database.update_scene_index(
+            await Database.update_scene_index(
                 video_id=video_id,
                 index_id=index_id,
-                status=ProcessingStatus.FAILED.value,
+                status=STATUS_FAILED,
                 error_message=str(e)
             )
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-
@@ -2,21 +2,22 @@
 Transcription endpoint
 """
 from fastapi import HTTPException
-from typing import Dict, Any
+from typing import Dict, Any, MutableMapping
 import logging
 import asyncio
-import json
+import orjson
 
-from ..database import Database, ProcessingStatus
+from ..database import Database, STATUS_COMPLETED, STATUS_FAILED, STATUS_PROCESSING
 from ..scene_indexer import SceneIndexer
 from ..models import TranscriptionRequest
+from .videodb_upload import ensure_uploaded
 
 logger = logging.getLogger(__name__)
 
 
 async def transcription_endpoint(
     scene_indexer: SceneIndexer,
-    video_file_cache: Dict[str, Any],
+    video_file_cache: MutableMapping[str, Any],
     request: TranscriptionRequest
 ) -> Dict[str, Any]:
     """
@@ -40,69 +41,75 @@ async def transcription_endpoint(
     
     try:
         video_id = request.video_id
-        video_url = str(request.video_url)
+        video_url = request.video_url
         logger.info(f"Uploading video for transcription: {video_url} (ID: {video_id})")
         
         # Create media record
-        Database.create_or_get_media(video_id, video_url, "video")
+        await Database.create_or_get_media(video_id, video_url, "video")
         
-        # Upload video to videodb
-        logger.info("Uploading video to videodb...")
-        video_file = scene_indexer.upload_video(video_url)
+        # Upload video to videodb (shared with concurrent requests for the same URL) and wait until ready
+        video_file = await ensure_uploaded(scene_indexer, video_file_cache, video_url)
         
-        # Store video file object in cache
-        video_file_cache[video_file.id] = video_file
-        
-        # Wait for upload with non-blocking status check
-        logger.info("Waiting for video upload to complete...")
-        max_wait_time = 300  # 5 minutes max
-        wait_interval = 2  # Check every 2 seconds
-        elapsed = 0
-        
-        while elapsed < max_wait_time:
-            # Check upload status (non-blocking)
-            try:
-                if hasattr(video_file, 'status'):
-                    status = video_file.status
-                    if status == 'ready' or status == 'completed':
-                        break
-                else:
-                    # Assume ready if no status attribute
-                    break
-            except Exception as e:
-                logger.warning(f"Error checking upload status: {str(e)}")
-            
-            await asyncio.sleep(wait_interval)
-            elapsed += wait_interval
+    except Exception as e:
+        logger.error(f"Error in transcription: {str(e)}")
+        await Database.update_transcription(
+            video_id=request.video_id,
+            status=STATUS_FAILED,
+            error_message=str(e)
+        )
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    
+    return await run_transcription(scene_indexer, video_file, request)
+
+
+async def run_transcription(
+    scene_indexer: SceneIndexer,
+    video_file: Any,
+    request: TranscriptionRequest
+) -> Dict[str, Any]:
+    """
+    Transcribe an already uploaded videodb video and save the results
+    
+    Args:
+        scene_indexer: SceneIndexer instance
+        video_file: Ready video file object from videodb
+        request: TranscriptionRequest with video_id
         
+    Returns:
+        Dictionary with video_id, status, and transcription data
+    """
+    video_id = request.video_id
+    try:
         logger.info("Video upload completed, starting transcription...")
         
         # Check if transcription record exists, create or update
-        existing_transcription = Database.get_transcription(video_id)
+        existing_transcription = await Database.get_transcription(video_id)
         if existing_transcription:
             # Update existing record
-            Database.update_transcription(
+            await Database.update_transcription(
                 video_id=video_id,
                 video_db_id=video_file.id,
-                status=ProcessingStatus.PROCESSING.value
+                status=STATUS_PROCESSING
             )
         else:
             # Create new record
-            Database.create_transcription(
+            await Database.create_transcription(
                 video_id=video_id,
                 video_db_id=video_file.id,
-                status=ProcessingStatus.PROCESSING.value
+                status=STATUS_PROCESSING
             )
         
         # Start transcription indexing
         try:
-            scene_indexer.index_spoken_words(
+            # Blocking SDK calls, run in a thread
+            await asyncio.to_thread(
+                scene_indexer.index_spoken_words,
                 video_file_obj=video_file
             )
             
             # Poll for transcript (get_transcript waits for completion)
             logger.info("Polling for transcription results...")
-            transcript = scene_indexer.get_transcript(video_file)
+            transcript = await asyncio.to_thread(scene_indexer.get_transcript, video_file)
         except Exception as e:
             error_msg = str(e)
             # Check if it's a "no spoken data" error
@@ -122,11 +129,11 @@ async def transcription_endpoint(
             segment_count = len(transcript)
         
         # Save results to database (even if empty/None)
-        Database.update_transcription(
+        await Database.update_transcription(
             video_id=video_id,
-            status=ProcessingStatus.COMPLETED.value,
+            status=STATUS_COMPLETED,
             segment_count=segment_count,
-            transcript_data=json.dumps(transcript) if transcript else None,
+            transcript_data=orjson.dumps(transcript).decode() if transcript else None,
             transcript_text=transcript_text
         )
         
@@ -143,9 +150,9 @@ async def transcription_endpoint(
         
     except Exception as e:
         logger.error(f"Error in transcription: {str(e)}")
-        Database.update_transcription(
+        await Database.update_transcription(
             video_id=video_id,
-            status=ProcessingStatus.FAILED.value,
+            status=STATUS_FAILED,
             error_message=str(e)
         )
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
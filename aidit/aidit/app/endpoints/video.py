@@ -2,23 +2,34 @@
 Video processing endpoint
 """
 from fastapi import HTTPException
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import logging
 import os
 import asyncio
 
-from ..database import Database, ProcessingStatus
+from ..database import Database, STATUS_COMPLETED, STATUS_FAILED, STATUS_PENDING, STATUS_PROCESSING
 from ..video_index import VideoIndex
 from ..video_processor import VideoProcessor
+from ..llm_batcher import LLMBatcher
 from ..models import VideoProcessRequest
 
 logger = logging.getLogger(__name__)
 
+# Finished frame rows are buffered and written with one bulk INSERT per this many frames
+FRAME_INSERT_BATCH_SIZE = int(os.getenv("FRAME_INSERT_BATCH_SIZE", "64"))
+
+# Pending placeholder rows are created up front in chunks of this size
+FRAME_INIT_BATCH_SIZE = 1000
+
+# Number of frame consumers per video (frames being encoded/sent to the LLM at once)
+FRAME_CONCURRENCY = int(os.getenv("FRAME_CONCURRENCY", "16"))
+
 
 async def process_video_endpoint(
     video_processor: VideoProcessor,
     video_index: VideoIndex,
-    request: VideoProcessRequest
+    request: VideoProcessRequest,
+    llm_batcher: Optional[LLMBatcher] = None
 ) -> Dict[str, Any]:
     """
     Process video frames concurrently
@@ -30,24 +41,25 @@ async def process_video_endpoint(
         video_processor: VideoProcessor instance
         video_index: VideoIndex instance for LLM processing
         request: VideoProcessRequest with video_id, video_url, granularity_seconds, prompt, model
+        llm_batcher: Optional LLMBatcher that coalesces frame LLM calls into multi-image requests
         
     Returns:
         Dictionary with video_id, status, and frame processing summary
     """
     try:
         video_id = request.video_id
-        video_url = str(request.video_url)
+        video_url = request.video_url
         granularity = request.granularity_seconds or 1.0
         
         logger.info(f"Processing video: {video_url} (ID: {video_id}, Granularity: {granularity}s)")
         
         # Create media record
-        Database.create_or_get_media(video_id, video_url, "video")
+        await Database.create_or_get_media(video_id, video_url, "video")
         
         # Create video processing record
-        video_processing = Database.create_or_get_video_processing(
+        video_processing = await Database.create_or_get_video_processing(
             video_id=video_id,
-            status=ProcessingStatus.PROCESSING.value,
+            status=STATUS_PROCESSING,
             granularity_seconds=granularity,
             prompt=request.prompt,
             model=request.model
@@ -58,87 +70,126 @@ async def process_video_endpoint(
         video_path = video_processor.download_video(video_url)
         
         try:
-            # Split video into frames
-            logger.info(f"Splitting video into frames (granularity: {granularity}s)...")
-            frames = video_processor.split_video_by_granularity(video_path, granularity)
+            # Plan frames up front from container metadata; extraction itself is streamed below
+            planned_frames = await asyncio.to_thread(video_processor.plan_frames_by_granularity, video_path, granularity)
+            total_frames = len(planned_frames)
+            await Database.update_video_processing(video_id, total_frames=total_frames)
             
-            total_frames = len(frames)
-            Database.update_video_processing(video_id, total_frames=total_frames)
+            # Pre-create every frame row as pending in one bulk INSERT; results are then
+            # written over them as batched upserts on (video_id, frame_number)
+            for start in range(0, total_frames, FRAME_INIT_BATCH_SIZE):
+                await Database.create_frames(video_id, [
+                    {"frame_number": frame_num, "timestamp_seconds": timestamp, "status": STATUS_PENDING}
+                    for frame_num, timestamp in planned_frames[start:start + FRAME_INIT_BATCH_SIZE]
+                ])
+            del planned_frames
             
             # Logging (non-blocking - won't fail if table is missing columns)
             try:
-                Database.create_log(video_id, None, "INFO", f"Extracted {total_frames} frames")
+                await Database.create_log(video_id, None, "INFO", f"Extracting ~{total_frames} frames")
             except Exception as log_error:
                 logger.warning(f"Could not create log entry: {str(log_error)}")
             
-            logger.info(f"Processing {total_frames} frames concurrently...")
+            logger.info(f"Processing ~{total_frames} frames with {FRAME_CONCURRENCY} workers (granularity: {granularity}s)...")
+            
+            # Frames uploaded to FRAME_STORAGE_BUCKET, removed once all LLM calls are done
+            uploaded_frames = []
             
-            # Process frames concurrently using asyncio
             async def process_frame(frame_data: tuple) -> Dict[str, Any]:
-                """Process a single frame asynchronously"""
+                """Process a single frame asynchronously, returning its frame record"""
                 frame_num, timestamp, frame_bytes = frame_data
                 try:
-                    # Convert frame to base64
-                    base64_image = video_processor.frame_bytes_to_base64(frame_bytes)
-                    
-                    # Process with LLM
-                    result = await asyncio.to_thread(
-                        video_index.process_image_from_base64,
-                        base64_image,
-                        request.prompt or "What's in this image?"
-                    )
+                    # Upload frame to storage (or inline it as base64)
+                    image_url = await video_processor.frame_to_image_url(video_id, frame_num, frame_bytes)
+                    if not image_url.startswith("data:"):
+                        uploaded_frames.append(frame_num)
                     
-                    # Save frame to database
-                    frame_record = Database.create_frame(
-                        video_id=video_id,
-                        frame_number=frame_num,
-                        timestamp_seconds=timestamp,
-                        status=ProcessingStatus.COMPLETED.value,
-                        llm_response=result.get("response", "")
-                    )
+                    # Process with LLM (batched with other frames when a batcher is running)
+                    prompt = request.prompt or "What's in this image?"
+                    if llm_batcher is not None:
+                        result = await llm_batcher.process(image_url, prompt)
+                    else:
+                        result = await asyncio.to_thread(video_index.process_image_from_url, image_url, prompt)
                     
                     return {
                         "frame_number": frame_num,
-                        "timestamp": timestamp,
-                        "status": "completed",
-                        "frame_id": frame_record.get("id")
+                        "timestamp_seconds": timestamp,
+                        "status": STATUS_COMPLETED,
+                        "llm_response": result.get("response", "")
                     }
                 except Exception as e:
                     logger.error(f"Error processing frame {frame_num}: {str(e)}")
-                    # Save failed frame
-                    Database.create_frame(
-                        video_id=video_id,
-                        frame_number=frame_num,
-                        timestamp_seconds=timestamp,
-                        status=ProcessingStatus.FAILED.value,
-                        error_message=str(e)
-                    )
                     return {
                         "frame_number": frame_num,
-                        "timestamp": timestamp,
-                        "status": "failed",
-                        "error": str(e)
+                        "timestamp_seconds": timestamp,
+                        "status": STATUS_FAILED,
+                        "error_message": str(e)
                     }
             
-            # Process all frames concurrently
-            tasks = [process_frame(frame_data) for frame_data in frames]
-            results = await asyncio.gather(*tasks)
+            # Producer decodes frames in a worker thread into a bounded queue; FRAME_CONCURRENCY
+            # consumers process them, so only a sliding window of frame bytes is ever resident
+            frames = video_processor.split_video_by_granularity_iter(video_path, granularity)
+            frame_queue: asyncio.Queue = asyncio.Queue(maxsize=FRAME_CONCURRENCY * 2)
+            extracted = 0
+            processed = 0
+            failed = 0
+            pending_rows = []
+            
+            async def produce_frames():
+                """Pull frames from the extractor and queue them for the consumers"""
+                nonlocal extracted
+                while (frame_data := await asyncio.to_thread(next, frames, None)) is not None:
+                    extracted += 1
+                    await frame_queue.put(frame_data)
+                for _ in range(FRAME_CONCURRENCY):
+                    await frame_queue.put(None)
+            
+            async def consume_frames():
+                """Process queued frames and flush finished rows in the background in batches"""
+                nonlocal processed, failed, pending_rows
+                while (frame_data := await frame_queue.get()) is not None:
+                    row = await process_frame(frame_data)
+                    del frame_data
+                    if row["status"] == STATUS_COMPLETED:
+                        processed += 1
+                    else:
+                        failed += 1
+                    pending_rows.append(row)
+                    if len(pending_rows) >= FRAME_INSERT_BATCH_SIZE:
+                        rows, pending_rows = pending_rows, []
+                        # Don't hold up this consumer on the DB round-trip
+                        tg.create_task(Database.create_frames(video_id, rows))
+            
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    tg.create_task(produce_frames())
+                    for _ in range(FRAME_CONCURRENCY):
+                        tg.create_task(consume_frames())
+            except ExceptionGroup as eg:
+                raise eg.exceptions[0]
+            finally:
+                await Database.delete_frame_uploads(video_id, uploaded_frames)
+            
+            if pending_rows:
+                await Database.create_frames(video_id, pending_rows)
             
-            # Count successes and failures
-            processed = sum(1 for r in results if r.get("status") == "completed")
-            failed = sum(1 for r in results if r.get("status") == "failed")
+            # Container frame counts are estimates; drop rows past what was actually extracted
+            # (unused placeholders or frames left from an earlier, longer run) and record the real count
+            await Database.delete_frames_from(video_id, extracted)
+            total_frames = extracted
             
             # Update video processing status
-            Database.update_video_processing(
+            await Database.update_video_processing(
                 video_id=video_id,
-                status=ProcessingStatus.COMPLETED.value,
+                status=STATUS_COMPLETED,
+                total_frames=total_frames,
                 processed_frames=processed,
                 failed_frames=failed
             )
             
             # Logging (non-blocking - won't fail if table is missing columns)
             try:
-                Database.create_log(video_id, None, "INFO", f"Processed {processed} frames, {failed} failed")
+                await Database.create_log(video_id, None, "INFO", f"Processed {processed} frames, {failed} failed")
             except Exception as log_error:
                 logger.warning(f"Could not create log entry: {str(log_error)}")
             
@@ -163,9 +214,9 @@ async def process_video_endpoint(
         
     except Exception as e:
         logger.error(f"Error processing video: {str(e)}")
-        Database.update_video_processing(
+        await Database.update_video_processing(
             video_id=request.video_id,
-            status=ProcessingStatus.FAILED.value,
+            status=STATUS_FAILED,
             error_message=str(e)
         )
         raise HTTPException(status_code=500, detail=f"Error processing video: {str(e)}")
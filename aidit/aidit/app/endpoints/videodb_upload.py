@@ -0,0 +1,101 @@
+"""
+Shared videodb upload helpers for the scene indexing and transcription endpoints
+"""
+from typing import Any, MutableMapping
+import logging
+import asyncio
+from cachetools import TTLCache
+
+from ..scene_indexer import SceneIndexer
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_READY_STATUSES = ("ready", "completed")
+
+# Uploads keyed by video_url (single-flight: concurrent callers share one upload task).
+# Failed uploads are dropped so the next caller retries; finished ones expire after an hour.
+_upload_futures: MutableMapping[str, asyncio.Task] = TTLCache(maxsize=1024, ttl=3600)
+
+
+async def await_upload(video_file: Any, timeout: float = 300) -> Any:
+    """
+    Wait for a videodb upload to become ready
+    
+    The videodb SDK has no completion callback, so the status is polled with
+    exponential backoff (100ms, growing 1.5x, capped at 2s). Files without a
+    status attribute are treated as ready immediately.
+    
+    Args:
+        video_file: Video file object returned by SceneIndexer.upload_video
+        timeout: Maximum seconds to wait before continuing anyway
+        
+    Returns:
+        The same video file object
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = 0.1
+    
+    while True:
+        try:
+            if not hasattr(video_file, 'status') or video_file.status in UPLOAD_READY_STATUSES:
+                return video_file
+        except Exception as e:
+            logger.warning(f"Error checking upload status: {str(e)}")
+        
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            logger.warning(f"Upload not ready after {timeout}s, continuing anyway")
+            return video_file
+        
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 1.5, 2.0)
+
+
+async def ensure_uploaded(
+    scene_indexer: SceneIndexer,
+    video_file_cache: MutableMapping[str, Any],
+    video_url: str
+) -> Any:
+    """
+    Upload a video to videodb once per URL and wait until it is ready
+    
+    Concurrent callers for the same video_url (e.g. scene indexing and
+    transcription in the batch endpoint) share one upload and one readiness wait.
+    
+    Args:
+        scene_indexer: SceneIndexer instance
+        video_file_cache: Cache for video file objects, keyed by videodb id
+        video_url: URL of the video to upload
+        
+    Returns:
+        Ready video file object from videodb
+    """
+    task = _upload_futures.get(video_url)
+    if task is None:
+        task = asyncio.create_task(_upload(scene_indexer, video_file_cache, video_url))
+        _upload_futures[video_url] = task
+        task.add_done_callback(lambda done: _forget_failed_upload(video_url, done))
+    else:
+        logger.info(f"Reusing videodb upload for {video_url}")
+    
+    # Shield so one caller being cancelled doesn't cancel the upload for the others
+    return await asyncio.shield(task)
+
+
+async def _upload(scene_indexer: SceneIndexer, video_file_cache: MutableMapping[str, Any], video_url: str) -> Any:
+    """Upload video_url (blocking SDK call, run in a thread) and wait for it to be ready"""
+    logger.info("Uploading video to videodb...")
+    video_file = await asyncio.to_thread(scene_indexer.upload_video, video_url)
+    
+    # Store video file object in cache
+    video_file_cache[video_file.id] = video_file
+    
+    logger.info("Waiting for video upload to complete...")
+    return await await_upload(video_file)
+
+
+def _forget_failed_upload(video_url: str, task: asyncio.Task):
+    """Drop a failed or cancelled upload so later callers retry it"""
+    if (task.cancelled() or task.exception() is not None) and _upload_futures.get(video_url) is task:
+        _upload_futures.pop(video_url, None)
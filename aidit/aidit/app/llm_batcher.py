@@ -0,0 +1,153 @@
+"""
+LLMBatcher class for coalescing concurrent image LLM calls into multi-image requests
+"""
+import asyncio
+import logging
+import os
+from typing import Optional, Dict, Any, List, Tuple
+
+from .video_index import VideoIndex
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBatcher:
+    """
+    Queue that groups concurrent image requests into batched LLM calls
+    
+    All image LLM work (uploaded images, image URLs and video frames) goes through
+    one instance started with the app. Callers await process(); a single worker
+    coroutine drains the queue, collecting up to max_batch_size items or waiting at
+    most max_delay seconds, and sends each group (same prompt) as one multi-image
+    request on a small fixed number of threads. Results are routed back via futures.
+    
+    Batching is opt-in (LLM_BATCHING=1): a batched answer comes from the multi-image
+    prompt and depends on whatever else arrived in the same window, so by default
+    process() sends each image on its own with the single-image prompt.
+    """
+    
+    def __init__(
+        self,
+        video_index: VideoIndex,
+        max_batch_size: int = int(os.getenv("LLM_BATCH_SIZE", "8")),
+        max_delay: float = float(os.getenv("LLM_BATCH_DELAY", "0.1")),
+        max_concurrent_batches: int = int(os.getenv("LLM_CONCURRENT_BATCHES", "4")),
+        enabled: bool = os.getenv("LLM_BATCHING", "0") == "1"
+    ):
+        """
+        Initialize LLMBatcher
+        
+        Args:
+            video_index: VideoIndex used for the LLM calls
+            max_batch_size: Maximum images per LLM request
+            max_delay: Maximum seconds to wait for a batch to fill
+            max_concurrent_batches: Maximum batched requests in flight
+            enabled: Start the batching worker; when False, process() makes single-image calls
+        """
+        self.video_index = video_index
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.max_concurrent_batches = max_concurrent_batches
+        self.enabled = enabled
+        self.queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batch_semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight = set()
+    
+    def start(self):
+        """Start the batching worker (must be called from the running event loop)"""
+        if self._worker is not None or not self.enabled:
+            return
+        
+        self.queue = asyncio.Queue()
+        self._batch_semaphore = asyncio.Semaphore(self.max_concurrent_batches)
+        self._worker = asyncio.create_task(self._run(), name="llm-batcher")
+        logger.info(f"LLM batcher started (max_batch_size={self.max_batch_size}, max_delay={self.max_delay}s)")
+    
+    async def stop(self):
+        """Stop the worker and fail any requests still waiting"""
+        if self._worker is None:
+            return
+        
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        
+        while not self.queue.empty():
+            _, _, future = self.queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("LLM batcher stopped"))
+        logger.info("LLM batcher stopped")
+    
+    async def process(self, image: str, prompt: str) -> Dict[str, Any]:
+        """
+        Process one image, batched with other concurrent requests
+        
+        Args:
+            image: Image URL, data URL, or raw base64 string
+            prompt: The prompt/question to ask about the image
+            
+        Returns:
+            Dictionary with response, model, and usage information
+        """
+        image_url = self.video_index.to_image_url(image)
+        if self._worker is None:
+            return await asyncio.to_thread(self.video_index.process_image_from_url, image_url, prompt)
+        
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((image_url, prompt, future))
+        return await future
+    
+    async def _run(self):
+        """Collect queued requests into batches and dispatch them"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            # One LLM call answers one prompt, so group by prompt
+            groups: Dict[str, List[Tuple[str, str, asyncio.Future]]] = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            
+            for prompt, items in groups.items():
+                await self._batch_semaphore.acquire()
+                task = asyncio.create_task(self._dispatch(prompt, items))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+    
+    async def _dispatch(self, prompt: str, items: List[Tuple[str, str, asyncio.Future]]):
+        """Send one batch and resolve its futures"""
+        try:
+            images = [image for image, _, _ in items]
+            try:
+                results = await asyncio.to_thread(self.video_index.process_images, images, prompt)
+            except Exception as e:
+                # Fall back to one request per image so a bad batch doesn't fail every frame
+                logger.warning(f"Batched LLM call for {len(items)} images failed, retrying individually: {str(e)}")
+                results = await asyncio.gather(
+                    *(asyncio.to_thread(self.video_index.process_image_from_url, image, prompt) for image in images),
+                    return_exceptions=True
+                )
+            
+            for (_, _, future), result in zip(items, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            self._batch_semaphore.release()
@@ -6,14 +6,17 @@ from fastapi import FastAPI, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
-from typing import Optional, Dict, Any
+from typing import Optional, Any, MutableMapping
 import logging
+import orjson
+from cachetools import TTLCache
 
 from .models import VideoProcessRequest, SceneIndexRequest, TranscriptionRequest, BatchProcessRequest
-from .database import Database
+from .database import Database, init_db, init_async_db, close_clients
 from .video_index import VideoIndex
 from .video_processor import VideoProcessor
 from .scene_indexer import SceneIndexer
+from .llm_batcher import LLMBatcher
 
 # Import endpoint handlers
 from .endpoints.image import process_image_endpoint
@@ -34,16 +37,37 @@ logger = logging.getLogger(__name__)
 app = FastAPI(title="Video Index API", version="2.0.0")
 
 # Add exception handler for validation errors
+VALIDATION_BODY_PREVIEW_BYTES = 1024
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc):
     """Log validation errors for debugging"""
-    logger.error(f"Validation error on {request.url.path}: {exc.errors()}")
-    logger.error(f"Request body: {await request.body()}")
+    # Read the (cached) body once and keep only a prefix; uploads can be many MB
+    body = (await request.body())[:VALIDATION_BODY_PREVIEW_BYTES]
+    if len(body) == VALIDATION_BODY_PREVIEW_BYTES:
+        body += b"...(truncated)"
+    
+    logger.error(f"Validation error on {request.url.path}: {orjson.dumps(exc.errors(), default=str).decode()}")
+    logger.error(f"Request body: {body}")
     return JSONResponse(
         status_code=422,
-        content={"detail": exc.errors(), "body": str(await request.body())}
+        content={"detail": exc.errors(), "body": str(body)}
     )
 
+@app.on_event("startup")
+async def startup():
+    """Initialize Supabase clients before the first request arrives"""
+    init_db()
+    await init_async_db()
+    llm_batcher.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop the LLM batcher and release pooled Supabase and LLM connections"""
+    await llm_batcher.stop()
+    await close_clients()
+    video_index.close()
+
 # Enable CORS
 app.add_middleware(
     CORSMiddleware,
@@ -56,15 +80,16 @@ app.add_middleware(
 # Initialize components
 video_index = VideoIndex()
 video_processor = VideoProcessor(video_index=video_index)
+llm_batcher = LLMBatcher(video_index=video_index)
 
 # Initialize scene indexer
+# videodb file objects by id; bounded and expiring so long-running servers don't pin stale handles
+video_file_cache: MutableMapping[str, Any] = TTLCache(maxsize=1024, ttl=3600)
 try:
     scene_indexer = SceneIndexer()
-    video_file_cache: Dict[str, Any] = {}
 except Exception as e:
     logger.warning(f"SceneIndexer not available: {str(e)}")
     scene_indexer = None
-    video_file_cache = {}
 
 
 # Endpoint 1: Process image/frame with file_id
@@ -83,7 +108,8 @@ async def process_image(
         image=image,
         image_url=image_url,
         prompt=prompt,
-        model=model
+        model=model,
+        llm_batcher=llm_batcher
     )
 
 
@@ -94,7 +120,8 @@ async def process_video_frames(request: VideoProcessRequest):
     return await process_video_endpoint(
         video_processor=video_processor,
         video_index=video_index,
-        request=request
+        request=request,
+        llm_batcher=llm_batcher
     )
 
 
@@ -147,6 +174,7 @@ async def batch_process(request: BatchProcessRequest):
         scene_indexer=scene_indexer,
         video_file_cache=video_file_cache,
         media_items=request.media_items,
+        llm_batcher=llm_batcher,
         frame_prompt=request.prompt,
         model=request.model,
         granularity_seconds=request.granularity_seconds,
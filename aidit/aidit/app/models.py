@@ -1,12 +1,32 @@
 """
 Pydantic models for API requests
 """
-from typing_extensions import Union
-from pydantic import BaseModel, HttpUrl
+from typing_extensions import Annotated
+from pydantic import AfterValidator, BaseModel, BeforeValidator, ConfigDict, HttpUrl, TypeAdapter
 from typing import Optional, List, Dict
 
+_http_url_adapter = TypeAdapter(HttpUrl)
+
+
+def _validate_http_url(url: str) -> str:
+    """Validate an http(s) URL once and keep it as a plain str (no Url object to convert later)"""
+    return str(_http_url_adapter.validate_python(url))
+
+
+VideoUrl = Annotated[str, AfterValidator(_validate_http_url)]
+
+
+def _int_to_str(value):
+    """Accept numeric media IDs as str (pydantic 2.5 has no coerce_numbers_to_str)"""
+    return str(value) if isinstance(value, int) and not isinstance(value, bool) else value
+
+
+MediaId = Annotated[str, BeforeValidator(_int_to_str)]
+
 
 class ImageProcessRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
     file_id: str  # Required index for the image
     image_url: Optional[str] = None  # URL of image (sent directly to LLM)
     prompt: Optional[str] = "What's in this image?"
@@ -14,16 +34,20 @@ class ImageProcessRequest(BaseModel):
 
 
 class VideoProcessRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
     video_id: str  # Required index for the video
-    video_url: HttpUrl
+    video_url: VideoUrl
     granularity_seconds: Optional[float] = 1.0
     prompt: Optional[str] = "What's in this image?"
     model: Optional[str] = "google/gemini-2.0-flash-001"
 
 
 class SceneIndexRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
     video_id: str  # Required index for the video
-    video_url: HttpUrl
+    video_url: VideoUrl
     extraction_type: Optional[str] = "shot_based"
     prompt: Optional[str] = "describe the image in 100 words"
     threshold: Optional[int] = 20
@@ -31,13 +55,17 @@ class SceneIndexRequest(BaseModel):
 
 
 class TranscriptionRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
     video_id: str  # Required index for the video
-    video_url: HttpUrl
+    video_url: VideoUrl
 
 
 class BatchProcessRequest(BaseModel):
     """Request model for batch processing"""
-    media_items: List[Union[str, int]]  # List of media IDs or message IDs
+    model_config = ConfigDict(extra="ignore")
+    
+    media_items: List[MediaId]  # List of media IDs or message IDs (numeric IDs become str)
     prompt: Optional[str] = "What's in this image?"
     model: Optional[str] = "google/gemini-2.0-flash-001"
     granularity_seconds: Optional[float] = 1.0
@@ -3,6 +3,7 @@ SceneIndexer class for video scene extraction using videodb
 """
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
 
@@ -12,10 +13,21 @@ try:
     import videodb
     from videodb import SceneExtractionType
     VIDEODB_AVAILABLE = True
+    _EXTRACTION_TYPES = {
+        "shot_based": SceneExtractionType.shot_based,
+        "time_based": SceneExtractionType.time_based
+    }
 except ImportError:
     VIDEODB_AVAILABLE = False
+    _EXTRACTION_TYPES = {}
     logging.warning("videodb not installed. Scene indexing will not work.")
 
+# Default extraction config per extraction type
+_EXTRACTION_DEFAULTS = {
+    "shot_based": {"threshold": 20, "frame_count": 5},
+    "time_based": {}
+}
+
 logger = logging.getLogger(__name__)
 
 
@@ -98,19 +110,13 @@ class SceneIndexer:
             logger.info(f"Indexing scenes for video: {video_file_obj.id}")
             
             # Map extraction type string to enum
-            if extraction_type == "shot_based":
-                scene_type = SceneExtractionType.shot_based
-            elif extraction_type == "time_based":
-                scene_type = SceneExtractionType.time_based
-            else:
+            scene_type = _EXTRACTION_TYPES.get(extraction_type)
+            if scene_type is None:
                 raise ValueError(f"Unknown extraction type: {extraction_type}")
             
-            # Default extraction config
+            # Default extraction config (copied so the SDK can't mutate the shared default)
             if extraction_config is None:
-                if extraction_type == "shot_based":
-                    extraction_config = {"threshold": 20, "frame_count": 5}
-                else:
-                    extraction_config = {}
+                extraction_config = dict(_EXTRACTION_DEFAULTS[extraction_type])
             
             # Build index_scenes arguments
             index_args = {
@@ -219,4 +225,44 @@ class SceneIndexer:
         except Exception as e:
             logger.error(f"Error getting transcript: {str(e)}")
             raise
-
+    
+    def prepare_video(
+        self,
+        video_path_or_url: str,
+        scene_cfg: Optional[Dict[str, Any]] = None,
+        lang: Optional[str] = None,
+        callback_url: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Upload a video, then start scene and spoken word indexing concurrently
+        
+        Args:
+            video_path_or_url: Path to the video file or URL (S3, HTTP, etc.)
+            scene_cfg: Keyword arguments for index_scenes (extraction_type, extraction_config, prompt)
+            lang: Optional language code for transcription
+            callback_url: Optional callback URL passed to both indexing calls
+            
+        Returns:
+            Dictionary with the uploaded video, its scene index ID, and a future that
+            completes when spoken word indexing has been started
+        """
+        video_file = self.upload_video(video_path_or_url)
+        
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            scene_future = executor.submit(
+                self.index_scenes, video_file, callback_url=callback_url, **(scene_cfg or {})
+            )
+            spoken_words_future = executor.submit(
+                self.index_spoken_words, video_file, language_code=lang, callback_url=callback_url
+            )
+            scene_index_id = scene_future.result()
+        finally:
+            # Don't wait on spoken word indexing; the caller holds its future
+            executor.shutdown(wait=False)
+        
+        return {
+            "video": video_file,
+            "scene_index_id": scene_index_id,
+            "spoken_words": spoken_words_future
+        }
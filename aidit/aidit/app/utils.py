@@ -2,23 +2,38 @@
 Utility functions for image processing
 """
 import base64
-from io import BytesIO
-from PIL import Image
+from typing import Optional
 
+try:
+    # SIMD (AVX2/AVX-512/NEON) base64 codec, several times faster than the stdlib on large buffers
+    from pybase64 import b64encode_as_string
+except ImportError:
+    def b64encode_as_string(data: bytes) -> str:
+        """Base64 encode bytes straight to an ASCII str (stdlib fallback)"""
+        return base64.b64encode(data).decode('ascii')
 
-def encode_image_to_base64(image_bytes: bytes) -> str:
-    """Convert image bytes to base64 data URL"""
-    base64_image = base64.b64encode(image_bytes).decode('utf-8')
-    try:
-        img = Image.open(BytesIO(image_bytes))
-        format_map = {
-            'JPEG': 'image/jpeg',
-            'PNG': 'image/png',
-            'GIF': 'image/gif',
-            'WEBP': 'image/webp'
-        }
-        img_format = format_map.get(img.format, 'image/jpeg')
-    except:
-        img_format = 'image/jpeg'
-    return f"data:{img_format};base64,{base64_image}"
 
+# Leading magic bytes -> MIME type for the formats the LLM accepts
+_IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+def sniff_image_mime_type(image_bytes: bytes) -> str:
+    """Detect image MIME type from the file signature (defaults to image/jpeg)"""
+    for signature, mime_type in _IMAGE_SIGNATURES:
+        if image_bytes.startswith(signature):
+            return mime_type
+    if image_bytes[:4] == b'RIFF' and image_bytes[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/jpeg'
+
+
+def encode_image_to_base64(image_bytes: bytes, mime_type: Optional[str] = None) -> str:
+    """Convert image bytes to base64 data URL (mime_type is sniffed from the bytes when not given)"""
+    if not mime_type or not mime_type.startswith('image/'):
+        mime_type = sniff_image_mime_type(image_bytes)
+    return f"data:{mime_type};base64,{b64encode_as_string(image_bytes)}"
@@ -1,34 +1,171 @@
 """
 VideoIndex class for handling API calls to LLM
 """
-import requests
+import httpx
+import asyncio
 import os
 import base64
+import hashlib
 import logging
-from typing import Optional, Dict, Any
+import sqlite3
+import threading
+import orjson
+from typing import Optional, Dict, Any, List, Union
 from dotenv import load_dotenv
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Entries kept in the LLM response cache; the oldest-written are pruned past this (0 = unbounded)
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000"))
+
+# Cache writes between prune passes
+LLM_CACHE_PRUNE_INTERVAL = 256
+
+# Cache key prefix for answers produced by the multi-image prompt (process_images)
+BATCH_CACHE_NAMESPACE = b'batch|'
+
 
 class VideoIndex:
     """
     Overarching class for handling API calls to LLM
     """
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "google/gemini-2.0-flash-001"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "google/gemini-2.0-flash-001",
+        cache_path: Optional[str] = None
+    ):
         self.api_key = api_key or os.getenv("OPENROUTER_KEY") or os.getenv("OPENROUTER_API_KEY")
         if not self.api_key:
             raise ValueError("OPENROUTER_KEY or OPENROUTER_API_KEY must be set")
         
         self.model = model
+        # Cache key prefix, encoded once instead of per image
+        self._model_bytes = model.encode() + b'|'
         self.url = "https://openrouter.ai/api/v1/chat/completions"
+        # Bodies are posted pre-serialized with orjson (content=), which writes UTF-8 bytes in one
+        # pass instead of json= building a str and encoding it again per base64 image
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        # Persistent HTTP/2 client: calls reuse one TLS connection instead of a handshake per frame
+        self.client = httpx.Client(
+            http2=True,
+            headers=self.headers,
+            timeout=120.0,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
+        # Async counterpart for process_images_batch, created on first use because it is bound
+        # to the event loop it runs on (the processor's persistent loop); closed by aclose()
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Content-addressed response cache: sha256(model|prompt|image data) -> result JSON.
+        # Only inline data/base64 images are cached; http(s)/s3 URLs aren't, since their
+        # content can change behind the same URL (and signed URLs would never hit).
+        # Off unless cache_path or LLM_CACHE_PATH is set (e.g. a file in the app's data directory).
+        # SQLite in WAL mode, so the parent and every ProcessPoolExecutor worker can open
+        # the same file and read/write it concurrently (dbm allows one writer process).
+        if cache_path is None:
+            cache_path = os.getenv("LLM_CACHE_PATH", "")
+        self.cache = None
+        self._cache_lock = threading.Lock()
+        self._cache_writes = 0
+        if cache_path:
+            try:
+                self.cache = sqlite3.connect(cache_path, timeout=10, check_same_thread=False, isolation_level=None)
+                self.cache.execute("PRAGMA journal_mode=WAL")
+                self.cache.execute("PRAGMA synchronous=NORMAL")
+                self.cache.execute("CREATE TABLE IF NOT EXISTS llm_cache (key BLOB PRIMARY KEY, value BLOB NOT NULL)")
+            except Exception as e:
+                logger.warning(f"LLM response cache disabled, could not open {cache_path}: {str(e)}")
+                if self.cache is not None:
+                    self.cache.close()
+                    self.cache = None
+    
+    def close(self):
+        """Close the HTTP client and the response cache"""
+        self.client.close()
+        if self.cache is not None:
+            with self._cache_lock:
+                self.cache.close()
+                self.cache = None
+    
+    async def aclose(self):
+        """Close the async HTTP client; await on the loop that used it"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_client_loop = None
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Return the async HTTP/2 client for the running loop, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            # A client left from another (finished) loop can't be reused or closed here
+            self._async_client = httpx.AsyncClient(
+                http2=True,
+                headers=self.headers,
+                timeout=120.0,
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60)
+            )
+            self._async_client_loop = loop
+        return self._async_client
+    
+    def _cache_key(self, image_url: str, prompt: str, namespace: bytes = b'') -> Optional[bytes]:
+        """
+        Cache key for one image/prompt under the current model, or None if the image isn't inline data
+        
+        Answers from the multi-image prompt use BATCH_CACHE_NAMESPACE, so they are never
+        replayed for single-image requests.
+        """
+        if not image_url.startswith("data:"):
+            return None
+        return hashlib.sha256(namespace + self._model_bytes + prompt.encode() + b'|' + image_url.encode()).digest()
+    
+    def _cache_get(self, key: Optional[bytes]) -> Optional[Dict[str, Any]]:
+        """
+        Return a cached result, or None on a miss
+        
+        Hits report empty usage and cached=True: no tokens were spent on them.
+        """
+        if self.cache is None or key is None:
+            return None
+        try:
+            with self._cache_lock:
+                row = self.cache.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM response cache read failed: {str(e)}")
+            return None
+        if row is None:
+            return None
+        result = orjson.loads(row[0])
+        result["usage"] = {}
+        result["cached"] = True
+        return result
+    
+    def _cache_set(self, key: Optional[bytes], result: Dict[str, Any]):
+        """Store a result in the cache, pruning the oldest entries every LLM_CACHE_PRUNE_INTERVAL writes"""
+        if self.cache is None or key is None:
+            return
+        try:
+            with self._cache_lock:
+                # REPLACE re-inserts with a new rowid, so rowid order is write order
+                self.cache.execute("INSERT OR REPLACE INTO llm_cache (key, value) VALUES (?, ?)",
+                                   (key, orjson.dumps(result)))
+                self._cache_writes += 1
+                if LLM_CACHE_MAX_ENTRIES and self._cache_writes % LLM_CACHE_PRUNE_INTERVAL == 0:
+                    self.cache.execute(
+                        "DELETE FROM llm_cache WHERE rowid <= (SELECT MAX(rowid) FROM llm_cache) - ?",
+                        (LLM_CACHE_MAX_ENTRIES,)
+                    )
+        except sqlite3.Error as e:
+            # e.g. the database stayed locked by another worker past the timeout
+            logger.warning(f"LLM response cache write failed: {str(e)}")
     
     def process_image_from_url(self, image_url: str, prompt: str = "What's in this image?") -> Dict[str, Any]:
         """
@@ -41,6 +178,11 @@ class VideoIndex:
         Returns:
             Dictionary with response, model, and usage information
         """
+        cache_key = self._cache_key(image_url, prompt)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             messages = [
                 {
@@ -66,17 +208,19 @@ class VideoIndex:
             }
             
             logger.info(f"Calling LLM API for image: {image_url[:50]}...")
-            response = requests.post(self.url, headers=self.headers, json=payload, timeout=120)
+            response = self.client.post(self.url, content=orjson.dumps(payload))
             response.raise_for_status()
             
-            result = response.json()
+            result = orjson.loads(response.content)
             
             if "choices" in result and len(result["choices"]) > 0:
-                return {
+                result = {
                     "response": result["choices"][0]["message"]["content"],
                     "model": result.get("model", self.model),
                     "usage": result.get("usage", {})
                 }
+                self._cache_set(cache_key, result)
+                return result
             else:
                 raise ValueError("No response from model")
                 
@@ -100,6 +244,11 @@ class VideoIndex:
             if not base64_image.startswith("data:"):
                 base64_image = f"data:image/jpeg;base64,{base64_image}"
             
+            cache_key = self._cache_key(base64_image, prompt)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+            
             messages = [
                 {
                     "role": "user",
@@ -124,21 +273,190 @@ class VideoIndex:
             }
             
             logger.info("Calling LLM API for base64 image")
-            response = requests.post(self.url, headers=self.headers, json=payload, timeout=120)
+            response = self.client.post(self.url, content=orjson.dumps(payload))
             response.raise_for_status()
             
-            result = response.json()
+            result = orjson.loads(response.content)
             
             if "choices" in result and len(result["choices"]) > 0:
-                return {
+                result = {
                     "response": result["choices"][0]["message"]["content"],
                     "model": result.get("model", self.model),
                     "usage": result.get("usage", {})
                 }
+                self._cache_set(cache_key, result)
+                return result
             else:
                 raise ValueError("No response from model")
                 
         except Exception as e:
             logger.error(f"Error processing base64 image: {str(e)}")
             raise
-
+    
+    async def process_images_batch(
+        self,
+        images: List[str],
+        prompt: str = "What's in this image?",
+        concurrency: int = 16
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Process many images concurrently, one LLM request per image
+        
+        Requests go over the persistent async HTTP/2 client, so batches reuse its
+        keep-alive connections, and at most `concurrency` are in flight at once.
+        
+        Args:
+            images: Image URLs, data URLs, or raw base64 strings
+            prompt: The prompt/question to ask about each image
+            concurrency: Maximum concurrent requests
+            
+        Returns:
+            List in image order of result dictionaries (response, model, usage) or the
+            exception raised for that image
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        client = self._get_async_client()
+        
+        async def process_one(image: str) -> Dict[str, Any]:
+            image_url = self.to_image_url(image)
+            cache_key = self._cache_key(image_url, prompt)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+            
+            payload = {
+                "model": self.model,
+                "messages": [
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": prompt},
+                            {"type": "image_url", "image_url": {"url": image_url}}
+                        ]
+                    }
+                ]
+            }
+            async with semaphore:
+                response = await client.post(self.url, content=orjson.dumps(payload))
+            response.raise_for_status()
+            
+            result = orjson.loads(response.content)
+            if "choices" in result and len(result["choices"]) > 0:
+                result = {
+                    "response": result["choices"][0]["message"]["content"],
+                    "model": result.get("model", self.model),
+                    "usage": result.get("usage", {})
+                }
+                self._cache_set(cache_key, result)
+                return result
+            raise ValueError("No response from model")
+        
+        logger.info(f"Calling LLM API for {len(images)} images (concurrency {concurrency})")
+        return await asyncio.gather(*(process_one(image) for image in images), return_exceptions=True)
+    
+    @staticmethod
+    def to_image_url(image: str) -> str:
+        """Return image as a URL the LLM accepts: http(s)/s3/data URLs as-is, raw base64 as a JPEG data URL"""
+        if image.startswith(("data:", "http://", "https://", "s3://")):
+            return image
+        return f"data:image/jpeg;base64,{image}"
+    
+    def process_images(self, images: List[str], prompt: str = "What's in this image?") -> List[Dict[str, Any]]:
+        """
+        Process several images with one LLM API call, answering the prompt per image
+        
+        Images already in the response cache are answered locally (single-image answers
+        first, then earlier batched ones); only misses are sent. Batched answers are cached
+        under their own namespace.
+        
+        Args:
+            images: Image URLs, data URLs, or raw base64 strings
+            prompt: The prompt/question to ask about each image
+            
+        Returns:
+            List of dictionaries with response, model, and usage information, in image order
+        """
+        image_urls = [self.to_image_url(image) for image in images]
+        results = [self._cache_get(self._cache_key(image_url, prompt)) for image_url in image_urls]
+        batch_keys = [self._cache_key(image_url, prompt, BATCH_CACHE_NAMESPACE) for image_url in image_urls]
+        for i, result in enumerate(results):
+            if result is None:
+                results[i] = self._cache_get(batch_keys[i])
+        misses = [i for i, result in enumerate(results) if result is None]
+        
+        if len(misses) == 1:
+            results[misses[0]] = self.process_image_from_url(image_urls[misses[0]], prompt)
+        elif misses:
+            for i, result in zip(misses, self._process_images_uncached([image_urls[i] for i in misses], prompt)):
+                self._cache_set(batch_keys[i], result)
+                results[i] = result
+        return results
+    
+    def _process_images_uncached(self, images: List[str], prompt: str) -> List[Dict[str, Any]]:
+        """Send several image URLs in one LLM request and parse the per-image answers"""
+        try:
+            count = len(images)
+            content = [
+                {
+                    "type": "text",
+                    "text": (
+                        f"{prompt}\n\n"
+                        f"You are given {count} images. Answer the request above separately for each image. "
+                        f"Respond only with a JSON array of {count} strings, one answer per image, "
+                        f"in the order the images were given."
+                    )
+                }
+            ]
+            for image in images:
+                content.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": image
+                    }
+                })
+            
+            payload = {
+                "model": self.model,
+                "messages": [{"role": "user", "content": content}]
+            }
+            
+            logger.info(f"Calling LLM API for {count} images")
+            response = self.client.post(self.url, content=orjson.dumps(payload))
+            response.raise_for_status()
+            
+            result = orjson.loads(response.content)
+            
+            if "choices" in result and len(result["choices"]) > 0:
+                answers = self._parse_batched_answers(result["choices"][0]["message"]["content"], count)
+                return [
+                    {
+                        "response": answer,
+                        "model": result.get("model", self.model),
+                        "usage": result.get("usage", {}),
+                        "batch_size": count
+                    }
+                    for answer in answers
+                ]
+            else:
+                raise ValueError("No response from model")
+                
+        except Exception as e:
+            logger.error(f"Error processing batched images: {str(e)}")
+            raise
+    
+    @staticmethod
+    def _parse_batched_answers(content: str, count: int) -> List[str]:
+        """Parse the JSON array of per-image answers from a batched completion"""
+        text = content.strip()
+        # Models often wrap JSON in a markdown code fence
+        if text.startswith("```"):
+            text = text.strip("`")
+            text = text[text.find("["):]
+        start, end = text.find("["), text.rfind("]")
+        if start == -1 or end == -1:
+            raise ValueError("Batched response is not a JSON array")
+        
+        answers = orjson.loads(text[start:end + 1])
+        if not isinstance(answers, list) or len(answers) != count:
+            raise ValueError(f"Batched response has {len(answers) if isinstance(answers, list) else 0} answers, expected {count}")
+        return [answer if isinstance(answer, str) else orjson.dumps(answer).decode() for answer in answers]
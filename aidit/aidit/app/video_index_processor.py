@@ -3,17 +3,56 @@ VideoIndexProcessor class for managing queues and background processing
 """
 import logging
 import threading
+import asyncio
 import queue
 import time
 import os
+import multiprocessing
+from multiprocessing.util import Finalize
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
-from .database import Database, ProcessingStatus, FrameStatus
+from .database import Database, ProcessingStatus, FrameStatus, STATUS_FAILED, STATUS_PROCESSING, close_clients
 from .video_index import VideoIndex
 from .video_processor import VideoProcessor
-from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+# Concurrent LLM requests per video
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "16"))
+
+# Frame results and logs are written in one request per this many frames
+FRAME_FLUSH_SIZE = 32
+
+# Decoded frames buffered ahead of the LLM calls
+FRAME_QUEUE_SIZE = 32
+
+# Frames whose perceptual hash is within this many bits of the last frame sent to the
+# LLM reuse its response instead of making a call (0 disables deduplication)
+PHASH_DUPLICATE_DISTANCE = int(os.getenv("PHASH_DUPLICATE_DISTANCE", "5"))
+
+# Per-process processor that runs video tasks inside ProcessPoolExecutor workers
+_process_worker: Optional["VideoIndexProcessor"] = None
+
+
+def _init_process_worker():
+    """
+    ProcessPoolExecutor initializer: give this process its own loop, HTTP clients and Supabase client
+    
+    Each worker also opens its own connection to the shared LLM response cache file; the
+    cache runs SQLite in WAL mode, so workers and the parent read and write it concurrently
+    and a response cached by one process is a hit in all of them.
+    """
+    global _process_worker
+    _process_worker = VideoIndexProcessor(num_workers=0)
+    _process_worker._start_loop()
+    # Runs on worker exit (multiprocessing skips atexit in children)
+    Finalize(None, _process_worker._close, exitpriority=10)
+
+
+def _run_video_task(task: dict):
+    """Run one video task in a worker process"""
+    _process_worker._process_video_task(task)
+
 
 class VideoIndexProcessor:
     """
@@ -31,6 +70,13 @@ class VideoIndexProcessor:
         self.num_workers = num_workers
         self.workers = []
         self.running = False
+        # Database and LLM coroutines from all workers run on this loop, so the
+        # async Supabase client and its connection pool stay bound to one loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        # Video tasks (frame decode/JPEG encode and base64 are CPU bound) run in worker
+        # processes so they scale past the GIL; these threads only dispatch to them
+        self._pool: Optional[ProcessPoolExecutor] = None
         self.video_index = VideoIndex()
         self.video_processor = VideoProcessor(video_index=self.video_index)
     
@@ -41,6 +87,14 @@ class VideoIndexProcessor:
             return
         
         self.running = True
+        self._start_loop()
+        # spawn, not fork: the Supabase/HTTP clients and loop threads must not be inherited
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_process_worker
+        )
+        
         for i in range(self.num_workers):
             worker = threading.Thread(target=self._worker, daemon=True, name=f"Worker-{i+1}")
             worker.start()
@@ -58,8 +112,31 @@ class VideoIndexProcessor:
             worker.join(timeout=5)
         
         self.workers = []
+        
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        
+        self._close()
         logger.info("Stopped all worker threads")
     
+    def _start_loop(self):
+        """Start the event loop thread that database and LLM coroutines run on"""
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, daemon=True, name="Processor-loop")
+        self._loop_thread.start()
+    
+    def _close(self):
+        """Close the Supabase and async LLM clients, stop the event loop and close the LLM client"""
+        if self._loop is not None:
+            self._run(close_clients())
+            self._run(self.video_index.aclose())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join(timeout=5)
+            self._loop = None
+            self._loop_thread = None
+        self.video_index.close()
+    
     def add_image_task(self, image_url: str, prompt: str = "What's in this image?", 
                       task_id: Optional[str] = None):
         """
@@ -107,24 +184,24 @@ class VideoIndexProcessor:
         logger.info(f"Worker {threading.current_thread().name} started")
         
         while self.running:
+            # Block until a task arrives; stop() wakes every worker with a None sentinel,
+            # so there is no need to poll the queue with a timeout
+            task = self.task_queue.get()
+            
+            # None is a signal to stop
+            if task is None:
+                self.task_queue.task_done()
+                break
+            
             try:
-                task = self.task_queue.get(timeout=1)
-                
-                # None is a signal to stop
-                if task is None:
-                    break
-                
                 if task["type"] == "image":
                     self._process_image_task(task)
                 elif task["type"] == "video":
-                    self._process_video_task(task)
-                
-                self.task_queue.task_done()
-                
-            except queue.Empty:
-                continue
+                    self._pool.submit(_run_video_task, task).result()
             except Exception as e:
                 logger.error(f"Error in worker {threading.current_thread().name}: {str(e)}")
+            finally:
+                self.task_queue.task_done()
         
         logger.info(f"Worker {threading.current_thread().name} stopped")
     
@@ -147,174 +224,249 @@ class VideoIndexProcessor:
     
     def _process_video_task(self, task: dict):
         """Process a video task with database tracking"""
-        db: Session = get_db_session()
+        video_id = task["video_id"]
+        video_path = None
+        logs = []
         try:
-            video_id = task["video_id"]
             logger.info(f"Processing video task: {video_id}")
             
-            # Import Media and VideoProcessing
-            from .database import Media, VideoProcessing
+            # Get or create Media and VideoProcessing records
+            self._run(Database.create_or_get_media(video_id, task["video_url"], "video"))
+            self._run(Database.create_or_get_video_processing(
+                video_id=video_id,
+                status=STATUS_PROCESSING,
+                granularity_seconds=task["granularity_seconds"],
+                prompt=task["prompt"],
+                model=task["model"]
+            ))
             
-            # Get or create Media record
-            media = db.query(Media).filter(Media.video_id == video_id).first()
-            if not media:
-                media = Media(
-                    video_id=video_id,
-                    video_url=task["video_url"],
-                    media_type="video"
-                )
-                db.add(media)
-                db.commit()
-                db.refresh(media)
+            self._log(logs, video_id, None, "INFO", f"Starting video processing: {video_id}")
             
-            # Get or create VideoProcessing record
-            video_processing = db.query(VideoProcessing).filter(
-                VideoProcessing.video_id == video_id
-            ).first()
-            if not video_processing:
-                video_processing = VideoProcessing(
-                    video_id=video_id,
-                    status=ProcessingStatus.PROCESSING,
-                    granularity_seconds=task["granularity_seconds"],
-                    prompt=task["prompt"],
-                    model=task["model"]
-                )
-                db.add(video_processing)
-                db.commit()
-                db.refresh(video_processing)
-            
-            # Keep Video for backward compatibility
-            video = db.query(Video).filter(Video.video_id == video_id).first()
-            if not video:
-                video = Video(
-                    video_id=video_id,
-                    video_url=task["video_url"],
-                    granularity_seconds=task["granularity_seconds"],
-                    prompt=task["prompt"],
-                    model=task["model"],
-                    status=ProcessingStatus.PROCESSING
-                )
-                db.add(video)
-                db.commit()
-                db.refresh(video)
-            
-            # Update status
-            video_processing.status = ProcessingStatus.PROCESSING
-            video.status = ProcessingStatus.PROCESSING
-            db.commit()
-            
-            self._log(db, video.id, None, "INFO", f"Starting video processing: {video_id}")
-            
-            # Download and split video
+            # Download video; frames are then decoded and sent while extraction continues
             video_path = self.video_processor.download_video(task["video_url"])
-            frames = self.video_processor.split_video_by_granularity(
-                video_path, 
-                task["granularity_seconds"]
+            frame_queue = queue.Queue(maxsize=FRAME_QUEUE_SIZE)
+            stop_event = threading.Event()
+            producer = threading.Thread(
+                target=self._produce_frames,
+                args=(video_path, task["granularity_seconds"], frame_queue, stop_event),
+                daemon=True,
+                name=f"Frames-{video_id}"
             )
+            producer.start()
             
-            video_processing.total_frames = len(frames)
-            Database.update_video_processing(video_id, total_frames=len(frames))
-            
-            Database.create_log(video_id, None, "INFO", f"Extracted {len(frames)} frames")
+            self._log(logs, video_id, None, "INFO", f"Processing frames (concurrency {LLM_CONCURRENCY})")
             
-            # Create frame records
-            frame_records = []
-            for frame_num, timestamp, frame_bytes in frames:
-                base64_image = self.video_processor.frame_bytes_to_base64(frame_bytes)
-                frame_record = Frame(
-                    video_id=video.id,
-                    frame_number=frame_num,
-                    timestamp_seconds=timestamp,
-                    base64_image=base64_image,
-                    status=FrameStatus.PENDING
-                )
-                frame_records.append((frame_record, base64_image))
-                db.add(frame_record)
-            
-            db.commit()
-            self._log(db, video.id, None, "INFO", f"Created {len(frame_records)} frame records")
-            
-            # Process each frame
-            for frame_record, base64_image in frame_records:
-                try:
-                    frame_record.status = FrameStatus.PROCESSING
-                    db.commit()
-                    
-                    self._log(db, video.id, frame_record.id, "INFO", 
-                             f"Processing frame {frame_record.frame_number}")
-                    
-                    # Call LLM API
-                    result = self.video_index.process_image_from_base64(
-                        base64_image,
-                        task["prompt"]
-                    )
-                    
-                    frame_record.llm_response = result.get("response", "")
-                    frame_record.status = FrameStatus.COMPLETED
-                    video_processing.processed_frames += 1
-                    video.processed_frames += 1
-                    
-                    self._log(db, video.id, frame_record.id, "INFO", 
-                             f"Frame {frame_record.frame_number} processed successfully")
-                    
-                except Exception as e:
-                    frame_record.status = FrameStatus.FAILED
-                    frame_record.error_message = str(e)
-                    video_processing.failed_frames += 1
-                    video.failed_frames += 1
-                    
-                    self._log(db, video.id, frame_record.id, "ERROR", 
-                             f"Frame {frame_record.frame_number} failed: {str(e)}")
-                
-                db.commit()
+            total_frames = 0
+            processed = 0
+            failed = 0
+            # Last frame sent to the LLM, carried across chunks for deduplication
+            last_unique = {"phash": None, "result": None}
+            try:
+                while True:
+                    chunk, done = self._next_chunk(frame_queue)
+                    if chunk:
+                        total_frames += len(chunk)
+                        chunk_processed, chunk_failed = self._process_frame_chunk(
+                            video_id, task["prompt"], chunk, logs, last_unique
+                        )
+                        processed += chunk_processed
+                        failed += chunk_failed
+                        # One progress write per chunk; status is only set once at the end
+                        self._run(Database.update_video_processing(
+                            video_id,
+                            total_frames=total_frames,
+                            processed_frames=processed,
+                            failed_frames=failed
+                        ))
+                    if done:
+                        break
+            finally:
+                stop_event.set()
+                producer.join(timeout=5)
             
-            # Update video status
-            if video_processing.failed_frames == 0:
-                video_processing.status = ProcessingStatus.COMPLETED
-                video.status = ProcessingStatus.COMPLETED
-            elif video_processing.processed_frames > 0:
-                video_processing.status = ProcessingStatus.COMPLETED  # Partial success
-                video.status = ProcessingStatus.COMPLETED  # Partial success
+            # Update video status (partial success still counts as completed)
+            if failed == 0 or processed > 0:
+                status = ProcessingStatus.COMPLETED.value
             else:
-                video_processing.status = ProcessingStatus.FAILED
-                video.status = ProcessingStatus.FAILED
-            
-            self._log(db, video.id, None, "INFO", 
-                     f"Video processing completed: {video_processing.processed_frames}/{video_processing.total_frames} frames processed")
+                status = ProcessingStatus.FAILED.value
+            self._run(Database.update_video_processing(
+                video_id,
+                status=status,
+                total_frames=total_frames,
+                processed_frames=processed,
+                failed_frames=failed
+            ))
             
-            db.commit()
+            self._log(logs, video_id, None, "INFO", 
+                     f"Video processing completed: {processed}/{total_frames} frames processed")
+            self._flush_logs(video_id, logs)
             
+        except Exception as e:
+            logger.error(f"Error processing video task: {str(e)}")
+            try:
+                self._run(Database.update_video_processing(video_id, 
+                    status=STATUS_FAILED,
+                    error_message=str(e)
+                ))
+                self._log(logs, video_id, None, "ERROR", f"Video processing failed: {str(e)}")
+                self._flush_logs(video_id, logs)
+            except Exception as db_error:
+                logger.error(f"Could not record failure for {video_id}: {str(db_error)}")
+        finally:
             # Clean up video file
             if video_path and os.path.exists(video_path):
                 try:
                     os.remove(video_path)
                 except Exception as e:
                     logger.warning(f"Could not remove video file: {str(e)}")
-            
+    
+    def _produce_frames(self, video_path: str, granularity_seconds: float,
+                        frame_queue: queue.Queue, stop_event: threading.Event):
+        """Decode frames into frame_queue as (frame_number, timestamp, jpeg_bytes, phash), then None"""
+        item = None
+        try:
+            for frame_num, timestamp, frame_bytes in self.video_processor.split_video_by_granularity_iter(
+                video_path, granularity_seconds
+            ):
+                phash = self.video_processor.frame_phash(frame_bytes)
+                if not self._put_frame(frame_queue, stop_event, (frame_num, timestamp, frame_bytes, phash)):
+                    return
         except Exception as e:
-            logger.error(f"Error processing video task: {str(e)}")
-            if 'video_id' in locals():
-                Database.update_video_processing(video_id, 
-                    status=ProcessingStatus.FAILED.value,
-                    error_message=str(e)
-                )
-                Database.create_log(video_id, None, "ERROR", f"Video processing failed: {str(e)}")
-        finally:
-            db.close()
+            # Re-raised by the consumer in _next_chunk
+            item = e
+        self._put_frame(frame_queue, stop_event, item)
     
-    def _log(self, db: Session, video_id: int, frame_id: Optional[int], 
+    @staticmethod
+    def _put_frame(frame_queue: queue.Queue, stop_event: threading.Event, item) -> bool:
+        """Put item on the bounded queue, giving up if the consumer has stopped"""
+        while not stop_event.is_set():
+            try:
+                frame_queue.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    @staticmethod
+    def _next_chunk(frame_queue: queue.Queue) -> tuple:
+        """Pull up to FRAME_FLUSH_SIZE frames; returns (frames, extraction_finished)"""
+        chunk = []
+        while len(chunk) < FRAME_FLUSH_SIZE:
+            item = frame_queue.get()
+            if item is None:
+                return chunk, True
+            if isinstance(item, Exception):
+                raise item
+            chunk.append(item)
+        return chunk, False
+    
+    def _process_frame_chunk(self, video_id: str, prompt: str, chunk: list, logs: list,
+                             last_unique: dict) -> tuple:
+        """
+        Create, process and write back one chunk of frames; returns (processed, failed)
+        
+        The chunk is split into per-field lists and emptied, so frame bytes and image
+        URLs are released as soon as the step that needs them is done.
+        """
+        frame_nums, timestamps, frame_bytes, phashes = (list(field) for field in zip(*chunk))
+        n_frames = len(frame_nums)
+        chunk.clear()
+        
+        frame_records = [
+            {
+                "frame_number": frame_num,
+                "timestamp_seconds": timestamp,
+                "status": FrameStatus.PROCESSING.value,
+                "phash": phash
+            }
+            for frame_num, timestamp, phash in zip(frame_nums, timestamps, phashes)
+        ]
+        created = self._run(Database.create_frames(video_id, frame_records))
+        frame_ids = {row.get("frame_number"): row.get("id") for row in created}
+        
+        # Only frames that differ visibly from the last frame sent go to the LLM; each
+        # frame maps to its representative in `unique` (None = previous chunk's last)
+        unique = []
+        sources = []
+        for i, phash in enumerate(phashes):
+            if (last_unique["phash"] is not None
+                    and self.video_processor.phash_distance(phash, last_unique["phash"]) < PHASH_DUPLICATE_DISTANCE):
+                sources.append(sources[-1] if sources else None)
+            else:
+                sources.append(len(unique))
+                unique.append(i)
+                last_unique["phash"] = phash
+        
+        image_urls = self._run(self._frame_image_urls(
+            video_id, [frame_nums[i] for i in unique], [frame_bytes[i] for i in unique]
+        ))
+        del frame_bytes
+        uploaded = [frame_nums[i] for i, image_url in zip(unique, image_urls) if not image_url.startswith("data:")]
+        unique_results = self._run(self.video_index.process_images_batch(
+            image_urls,
+            prompt,
+            concurrency=LLM_CONCURRENCY
+        ))
+        del image_urls
+        # The LLM has read the frames; drop the copies uploaded to storage
+        self._run(Database.delete_frame_uploads(video_id, uploaded))
+        results = [last_unique["result"] if source is None else unique_results[source] for source in sources]
+        if unique_results:
+            last_unique["result"] = unique_results[-1]
+        
+        processed = 0
+        failed = 0
+        for frame_record, result in zip(frame_records, results):
+            frame_id = frame_ids.get(frame_record["frame_number"])
+            if isinstance(result, Exception):
+                frame_record["status"] = FrameStatus.FAILED.value
+                frame_record["error_message"] = str(result)
+                failed += 1
+                
+                self._log(logs, video_id, frame_id, "ERROR", 
+                         f"Frame {frame_record['frame_number']} failed: {str(result)}")
+            else:
+                frame_record["status"] = FrameStatus.COMPLETED.value
+                frame_record["llm_response"] = result.get("response", "")
+                processed += 1
+                
+                self._log(logs, video_id, frame_id, "INFO", 
+                         f"Frame {frame_record['frame_number']} processed successfully")
+        
+        if len(unique) < n_frames:
+            self._log(logs, video_id, None, "INFO",
+                     f"Reused responses for {n_frames - len(unique)} near-duplicate frames")
+        
+        self._run(Database.create_frames(video_id, frame_records))
+        self._flush_logs(video_id, logs)
+        return processed, failed
+    
+    async def _frame_image_urls(self, video_id: str, frame_nums: list, frame_bytes: list) -> list:
+        """Upload (or base64 encode) frames concurrently"""
+        return await asyncio.gather(*(
+            self.video_processor.frame_to_image_url(video_id, frame_num, data)
+            for frame_num, data in zip(frame_nums, frame_bytes)
+        ))
+    
+    def _run(self, coro):
+        """Run a coroutine on the processor's event loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+    
+    def _log(self, logs: list, video_id: str, frame_id: Optional[int], 
             level: str, message: str):
-        """Add a log entry to the database"""
-        log_entry = ProcessingLog(
-            video_id=video_id,
-            frame_id=frame_id,
-            log_level=level,
-            message=message
-        )
-        db.add(log_entry)
-        db.commit()
+        """Buffer a log entry for the database (written by _flush_logs)"""
+        logs.append({
+            "frame_id": frame_id,
+            "level": level,
+            "message": message
+        })
         logger.log(
             getattr(logging, level, logging.INFO),
             f"[Video {video_id}] {message}"
         )
-
+    
+    def _flush_logs(self, video_id: str, logs: list):
+        """Write buffered log entries in one insert and clear the buffer"""
+        if logs:
+            self._run(Database.create_logs(video_id, logs))
+            logs.clear()
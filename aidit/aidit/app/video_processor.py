@@ -2,17 +2,67 @@
 VideoProcessor class for handling video splitting and frame extraction
 """
 import cv2
+import hashlib
+import numpy as np
+import orjson
 import requests
 import os
-import base64
+import shutil
 import logging
 import tempfile
-from typing import List, Tuple, Optional, Dict
-from io import BytesIO
-from PIL import Image
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Optional, Dict, Iterator
+
+from .utils import encode_image_to_base64
+from .database import Database, FRAME_STORAGE_BUCKET
 
 logger = logging.getLogger(__name__)
 
+# Frames are for a VLM that resizes to about 1024px anyway: cap the long side at
+# FRAME_MAX_DIMENSION (0 keeps full resolution) and encode at FRAME_JPEG_QUALITY
+FRAME_MAX_DIMENSION = int(os.getenv("FRAME_MAX_DIMENSION", "1024"))
+FRAME_JPEG_QUALITY = int(os.getenv("FRAME_JPEG_QUALITY", "75"))
+
+# JPEG settings for extracted frames: optimized Huffman tables and progressive scans
+# make files smaller than baseline at the same quality; chroma gets a lower quality than luma
+JPEG_ENCODE_PARAMS = [
+    int(cv2.IMWRITE_JPEG_QUALITY), FRAME_JPEG_QUALITY,
+    int(cv2.IMWRITE_JPEG_CHROMA_QUALITY), min(FRAME_JPEG_QUALITY, 60),
+    int(cv2.IMWRITE_JPEG_OPTIMIZE), 1,
+    int(cv2.IMWRITE_JPEG_PROGRESSIVE), 1
+]
+
+# Frame gap at which split_video_by_granularity seeks instead of grabbing through every
+# frame (about one x264 default GOP; seeking decodes from the preceding keyframe anyway)
+SEEK_MIN_FRAME_INTERVAL = 250
+
+# Concurrent LLM requests in process_video
+PROCESS_VIDEO_CONCURRENCY = int(os.getenv("PROCESS_VIDEO_CONCURRENCY", "16"))
+
+# Frames sent per LLM request in process_video (1 sends every frame on its own)
+PROCESS_VIDEO_BATCH_SIZE = max(1, int(os.getenv("PROCESS_VIDEO_BATCH_SIZE", "8")))
+
+# process_video pipeline: frames buffered between stages, and JPEG encoder threads
+PIPELINE_PREFETCH = 8
+PIPELINE_ENCODER_THREADS = 2
+
+# Decode http(s) videos directly with OpenCV's FFmpeg backend instead of downloading them
+STREAM_VIDEO_URLS = os.getenv("STREAM_VIDEO_URLS", "true").lower() != "false"
+
+# Read/write size for video downloads; large chunks keep the per-chunk syscall count low
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Encoded process_video frames can be cached here per (video URL, granularity) so reprocessing
+# a video skips download, decode and encode. Off unless FRAME_CACHE_DIR is set: entries are
+# keyed by URL, so only enable it where a URL's content doesn't change
+FRAME_CACHE_DIR = os.path.expanduser(os.getenv("FRAME_CACHE_DIR", ""))
+# Total size of the frame cache; least recently used entries are evicted past it
+FRAME_CACHE_MAX_BYTES = int(os.getenv("FRAME_CACHE_MAX_MB", "2048")) * 1024 * 1024
+# Written last in each cache entry; holds the (frame_number, timestamp) index
+FRAME_CACHE_MARKER = "done.marker"
+
 
 class VideoProcessor:
     """
@@ -28,6 +78,23 @@ class VideoProcessor:
         """
         self.video_index = video_index
     
+    @staticmethod
+    def _open_capture(video_path: str) -> cv2.VideoCapture:
+        """Open a local video file, or an http(s) URL streamed through the FFmpeg backend"""
+        if video_path.startswith(('http://', 'https://')):
+            return cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+        return cv2.VideoCapture(video_path)
+    
+    def can_stream(self, video_url: str) -> bool:
+        """Whether video_url can be decoded straight from HTTP without downloading it first"""
+        if not STREAM_VIDEO_URLS or not video_url.startswith(('http://', 'https://')):
+            return False
+        cap = self._open_capture(video_url)
+        try:
+            return cap.isOpened()
+        finally:
+            cap.release()
+    
     def download_video(self, video_url: str, output_path: Optional[str] = None) -> str:
         """
         Download video from URL
@@ -47,12 +114,22 @@ class VideoProcessor:
                 temp_dir = tempfile.gettempdir()
                 output_path = os.path.join(temp_dir, f"video_{os.urandom(8).hex()}.mp4")
             
-            response = requests.get(video_url, stream=True, timeout=300)
-            response.raise_for_status()
-            
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            with requests.get(video_url, stream=True, timeout=300) as response:
+                response.raise_for_status()
+                # Undo any Content-Encoding while copying straight from the socket
+                response.raw.decode_content = True
+                
+                with open(output_path, 'wb') as f:
+                    # Reserve the whole file up front to avoid fragmentation (Content-Length
+                    # is only the file size when the body isn't compressed)
+                    content_length = response.headers.get('Content-Length')
+                    if (content_length and content_length.isdigit() and hasattr(os, 'posix_fallocate')
+                            and response.headers.get('Content-Encoding', 'identity') == 'identity'):
+                        try:
+                            os.posix_fallocate(f.fileno(), 0, int(content_length))
+                        except OSError:
+                            pass
+                    shutil.copyfileobj(response.raw, f, length=DOWNLOAD_CHUNK_SIZE)
             
             logger.info(f"Video downloaded to: {output_path}")
             return output_path
@@ -72,51 +149,157 @@ class VideoProcessor:
         Returns:
             List of tuples: (frame_number, timestamp_seconds, frame_bytes)
         """
-        try:
-            logger.info(f"Splitting video: {video_path} with granularity: {granularity_seconds}s")
+        frames = list(self.split_video_by_granularity_iter(video_path, granularity_seconds))
+        logger.info(f"Extracted {len(frames)} frames from video")
+        return frames
+    
+    def split_video_by_granularity_iter(self, video_path: str, granularity_seconds: float = 1.0) -> Iterator[Tuple[int, float, bytes]]:
+        """
+        Lazily split video into frames based on granularity (seconds)
+        
+        Frames are decoded and JPEG encoded one at a time as the caller iterates,
+        so only the frames the caller still holds stay in memory.
+        
+        Args:
+            video_path: Path to video file
+            granularity_seconds: Interval in seconds between frames
             
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                raise ValueError(f"Could not open video: {video_path}")
+        Yields:
+            Tuples: (frame_number, timestamp_seconds, frame_bytes)
+        """
+        # Each frame is encoded before the next is decoded, so one decode buffer can be reused
+        for frame_num, timestamp, frame in self.decode_frames_by_granularity_iter(
+            video_path, granularity_seconds, reuse_buffer=True
+        ):
+            yield (frame_num, timestamp, self.encode_frame(frame))
+    
+    @staticmethod
+    def encode_frame(frame: np.ndarray) -> bytes:
+        """JPEG encode a decoded BGR frame, downscaled to FRAME_MAX_DIMENSION"""
+        height, width = frame.shape[:2]
+        if FRAME_MAX_DIMENSION and max(height, width) > FRAME_MAX_DIMENSION:
+            scale = FRAME_MAX_DIMENSION / max(height, width)
+            frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        
+        # Encode the BGR frame directly (libjpeg-turbo, no RGB copy or PIL image)
+        ok, buffer = cv2.imencode('.jpg', frame, JPEG_ENCODE_PARAMS)
+        if not ok:
+            raise ValueError("Could not encode frame as JPEG")
+        return buffer.tobytes()
+    
+    def decode_frames_by_granularity_iter(self, video_path: str, granularity_seconds: float = 1.0,
+                                          reuse_buffer: bool = False) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """
+        Lazily decode the frames split_video_by_granularity_iter extracts, without encoding them
+        
+        Args:
+            video_path: Path to video file, or http(s) URL to stream
+            granularity_seconds: Interval in seconds between frames
+            reuse_buffer: Decode every frame into the same array (only safe when the caller
+                is done with a frame before requesting the next)
             
+        Yields:
+            Tuples: (frame_number, timestamp_seconds, BGR frame array)
+        """
+        logger.info(f"Splitting video: {video_path} with granularity: {granularity_seconds}s")
+        
+        cap = self._open_capture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video: {video_path}")
+        
+        try:
             fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_interval = int(fps * granularity_seconds)
+            frame_interval = max(1, int(fps * granularity_seconds))
             
-            frames = []
+            # Past this gap, seeking (decode from the preceding keyframe) beats decoding every frame
+            seek = frame_interval >= SEEK_MIN_FRAME_INTERVAL
+            
+            extracted = 0
             frame_number = 0
-            current_time = 0.0
+            target = 0
+            frame = None
             
             while True:
-                ret, frame = cap.read()
+                if seek and target > frame_number:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                    frame_number = target
+                
+                # Advance to the target frame with grab(), which decodes without the
+                # color conversion and copy that read()/retrieve() do
+                while frame_number < target and cap.grab():
+                    frame_number += 1
+                if frame_number < target:
+                    break
+                
+                # read(frame) decodes in place into the previous frame's array
+                ret, frame = cap.read(frame) if reuse_buffer and frame is not None else cap.read()
                 if not ret:
                     break
+                frame_number += 1
+                current_time = target / fps
                 
-                # Only extract frame if it matches the granularity interval
-                if frame_number % frame_interval == 0:
-                    # Convert BGR to RGB
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    
-                    # Convert to PIL Image
-                    pil_image = Image.fromarray(frame_rgb)
-                    
-                    # Convert to bytes
-                    buffer = BytesIO()
-                    pil_image.save(buffer, format='JPEG')
-                    frame_bytes = buffer.getvalue()
-                    
-                    frames.append((len(frames), current_time, frame_bytes))
-                    logger.debug(f"Extracted frame {len(frames)-1} at {current_time:.2f}s")
+                logger.debug(f"Extracted frame {extracted} at {current_time:.2f}s")
+                yield (extracted, current_time, frame)
+                extracted += 1
+                target += frame_interval
                 
-                frame_number += 1
-                current_time = frame_number / fps
-            
-            cap.release()
-            logger.info(f"Extracted {len(frames)} frames from video")
-            return frames
-            
         except Exception as e:
             logger.error(f"Error splitting video: {str(e)}")
             raise
+        finally:
+            cap.release()
+    
+    def plan_frames_by_granularity(self, video_path: str, granularity_seconds: float = 1.0) -> List[Tuple[int, float]]:
+        """
+        Predict which frames split_video_by_granularity will extract without decoding
+        
+        Args:
+            video_path: Path to video file
+            granularity_seconds: Interval in seconds between frames
+            
+        Returns:
+            List of tuples: (frame_number, timestamp_seconds), from the container's frame count and FPS
+        """
+        cap = self._open_capture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video: {video_path}")
+        
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            frame_interval = max(1, int(fps * granularity_seconds))
+            return [
+                (index, index * frame_interval / fps)
+                for index in range(-(-frame_count // frame_interval))
+            ]
+        finally:
+            cap.release()
+    
+    @staticmethod
+    def frame_phash(frame_bytes: bytes) -> int:
+        """
+        64-bit perceptual hash (DCT hash) of a JPEG frame
+        
+        Near-identical frames differ in only a few bits; compare with phash_distance.
+        
+        Args:
+            frame_bytes: JPEG bytes
+            
+        Returns:
+            Hash as a signed 64-bit integer (fits a Postgres BIGINT)
+        """
+        # Decode at 1/8 scale straight to grayscale, then DCT a 32x32 thumbnail
+        gray = cv2.imdecode(np.frombuffer(frame_bytes, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        thumbnail = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+        low = cv2.dct(thumbnail)[:8, :8].flatten()
+        bits = low > np.median(low[1:])
+        value = int.from_bytes(np.packbits(bits).tobytes(), "big")
+        return value - (1 << 64) if value >= 1 << 63 else value
+    
+    @staticmethod
+    def phash_distance(a: int, b: int) -> int:
+        """Number of differing bits between two frame_phash values"""
+        return ((a ^ b) & 0xFFFFFFFFFFFFFFFF).bit_count()
     
     def frame_bytes_to_base64(self, frame_bytes: bytes) -> str:
         """
@@ -128,8 +311,39 @@ class VideoProcessor:
         Returns:
             Base64 data URL string
         """
-        base64_image = base64.b64encode(frame_bytes).decode('utf-8')
-        return f"data:image/jpeg;base64,{base64_image}"
+        # Frames are always JPEG encoded by split_video_by_granularity_iter, so skip the sniff
+        return encode_image_to_base64(frame_bytes, mime_type="image/jpeg")
+    
+    async def frame_to_image_url(self, video_id: str, frame_number: int, frame_bytes: bytes) -> str:
+        """
+        Get the URL to send the LLM for a frame
+        
+        Uploads the frame to FRAME_STORAGE_BUCKET and returns its signed URL when a bucket
+        is configured, otherwise (or if the upload fails) returns a base64 data URL.
+        
+        Args:
+            video_id: Video the frame belongs to
+            frame_number: Frame number
+            frame_bytes: JPEG bytes
+            
+        Returns:
+            Signed storage URL or base64 data URL
+        """
+        if FRAME_STORAGE_BUCKET:
+            try:
+                return await Database.upload_frame(video_id, frame_number, frame_bytes)
+            except Exception as e:
+                logger.warning(f"Frame upload failed, sending frame {frame_number} inline: {str(e)}")
+        return self.frame_bytes_to_base64(frame_bytes)
+    
+    def frame_to_image_url_sync(self, video_id: str, frame_number: int, frame_bytes: bytes) -> str:
+        """Blocking frame_to_image_url for worker threads"""
+        if FRAME_STORAGE_BUCKET:
+            try:
+                return Database.upload_frame_sync(video_id, frame_number, frame_bytes)
+            except Exception as e:
+                logger.warning(f"Frame upload failed, sending frame {frame_number} inline: {str(e)}")
+        return self.frame_bytes_to_base64(frame_bytes)
     
     def process_video(self, video_url: str, granularity_seconds: float = 1.0, 
                      prompt: str = "What's in this image?", 
@@ -137,6 +351,9 @@ class VideoProcessor:
         """
         Complete video processing pipeline: download, split, and process frames
         
+        Encoded frames are cached under FRAME_CACHE_DIR, so processing the same URL at the
+        same granularity again skips download, decode and encode.
+        
         Args:
             video_url: URL of video to process
             granularity_seconds: Interval between frames
@@ -147,32 +364,30 @@ class VideoProcessor:
             List of processing results for each frame
         """
         video_path = None
+        frames = None
         try:
-            # Download video
-            video_path = self.download_video(video_url)
+            cache_path = self.frame_cache_path(video_url, granularity_seconds)
+            cache_index = self.read_frame_cache_index(cache_path) if cache_path else None
             
-            # Split video into frames
-            frames = self.split_video_by_granularity(video_path, granularity_seconds)
+            if cache_index is not None:
+                logger.info(f"Using {len(cache_index)} cached frames from {cache_path}")
+                frames = self.iter_cached_frames(cache_path, cache_index)
+            else:
+                # Decode straight from the URL when possible (no temp file, decoding starts as
+                # bytes arrive); otherwise download first
+                if self.can_stream(video_url):
+                    video_source = video_url
+                else:
+                    video_path = self.download_video(video_url)
+                    video_source = video_path
+                
+                frames = self._encode_frames_pipelined(video_source, granularity_seconds)
+                if cache_path:
+                    frames = self.cache_frames(frames, cache_path)
             
-            # Process each frame if video_index is available
-            results = []
             if self.video_index:
-                for frame_num, timestamp, frame_bytes in frames:
-                    try:
-                        base64_image = self.frame_bytes_to_base64(frame_bytes)
-                        result = self.video_index.process_image_from_base64(base64_image, prompt)
-                        results.append({
-                            "frame_number": frame_num,
-                            "timestamp": timestamp,
-                            "result": result
-                        })
-                    except Exception as e:
-                        logger.error(f"Error processing frame {frame_num}: {str(e)}")
-                        results.append({
-                            "frame_number": frame_num,
-                            "timestamp": timestamp,
-                            "error": str(e)
-                        })
+                # Frames are sent to the LLM while later ones are still being decoded
+                results = self._process_frames(frames, prompt)
             else:
                 # Just return frame info without processing
                 results = [
@@ -183,10 +398,15 @@ class VideoProcessor:
                     }
                     for frame_num, timestamp, frame_bytes in frames
                 ]
+                results.sort(key=lambda result: result["frame_number"])
             
             return results
             
         finally:
+            # Stops the decode/encode threads if processing failed part way through
+            if frames is not None:
+                frames.close()
+            
             # Clean up downloaded video file
             if video_path and os.path.exists(video_path):
                 try:
@@ -194,4 +414,312 @@ class VideoProcessor:
                     logger.info(f"Cleaned up video file: {video_path}")
                 except Exception as e:
                     logger.warning(f"Could not remove video file: {str(e)}")
-
+    
+    @staticmethod
+    def frame_cache_path(video_url: str, granularity_seconds: float) -> Optional[str]:
+        """
+        Cache directory for a video's encoded frames (None when caching is disabled)
+        
+        The key also covers the frame size and JPEG quality, so changing either doesn't
+        serve frames encoded with the old settings.
+        """
+        if not FRAME_CACHE_DIR:
+            return None
+        key = f"{video_url}|{granularity_seconds}|{FRAME_MAX_DIMENSION}|{FRAME_JPEG_QUALITY}"
+        return os.path.join(FRAME_CACHE_DIR, hashlib.sha256(key.encode()).hexdigest())
+    
+    @staticmethod
+    def read_frame_cache_index(cache_path: str) -> Optional[List[Tuple[int, float]]]:
+        """
+        Read the (frame_number, timestamp) index of a complete cache entry
+        
+        Returns:
+            Index in frame order, or None if the entry is missing or was never finished
+        """
+        marker_path = os.path.join(cache_path, FRAME_CACHE_MARKER)
+        try:
+            with open(marker_path, "rb") as f:
+                cache_index = [tuple(entry) for entry in orjson.loads(f.read())]
+            # The marker's mtime is the entry's last use for prune_frame_cache
+            os.utime(marker_path)
+            return cache_index
+        except FileNotFoundError:
+            return None
+        except (OSError, orjson.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable frame cache {cache_path}: {str(e)}")
+            return None
+    
+    @staticmethod
+    def iter_cached_frames(cache_path: str, cache_index: List[Tuple[int, float]]) -> Iterator[Tuple[int, float, bytes]]:
+        """
+        Lazily load cached frames as (frame_number, timestamp, frame_bytes) tuples
+        """
+        for frame_num, timestamp in cache_index:
+            with open(os.path.join(cache_path, f"{frame_num}.jpg"), "rb") as f:
+                if hasattr(os, "posix_fadvise"):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                frame_bytes = f.read()
+            yield frame_num, timestamp, frame_bytes
+    
+    @staticmethod
+    def cache_frames(frames: Iterator[Tuple[int, float, bytes]], cache_path: str) -> Iterator[Tuple[int, float, bytes]]:
+        """
+        Pass frames through, writing each to the cache as it goes
+        
+        Every file is written to a temporary name and renamed into place, and the
+        FRAME_CACHE_MARKER index is only written once all frames have been cached, so an
+        interrupted run never leaves an entry that looks complete. Cache write errors are
+        logged and don't affect processing.
+        """
+        cache_index = []
+        caching = True
+        
+        def write_atomic(path: str, data: bytes):
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        
+        try:
+            os.makedirs(cache_path, exist_ok=True)
+        except OSError as e:
+            logger.warning(f"Frame cache disabled for this run: {str(e)}")
+            caching = False
+        
+        for frame_num, timestamp, frame_bytes in frames:
+            if caching:
+                try:
+                    write_atomic(os.path.join(cache_path, f"{frame_num}.jpg"), frame_bytes)
+                    cache_index.append((frame_num, timestamp))
+                except OSError as e:
+                    logger.warning(f"Frame cache disabled for this run: {str(e)}")
+                    caching = False
+            yield frame_num, timestamp, frame_bytes
+        
+        if caching:
+            try:
+                cache_index.sort()
+                write_atomic(os.path.join(cache_path, FRAME_CACHE_MARKER), orjson.dumps(cache_index))
+                logger.info(f"Cached {len(cache_index)} frames in {cache_path}")
+            except OSError as e:
+                logger.warning(f"Could not finish frame cache {cache_path}: {str(e)}")
+            VideoProcessor.prune_frame_cache(keep=cache_path)
+    
+    @staticmethod
+    def prune_frame_cache(keep: Optional[str] = None):
+        """
+        Evict least recently used frame cache entries until the cache fits FRAME_CACHE_MAX_BYTES
+        
+        Entries are ordered by their marker's mtime (updated on every hit); unfinished
+        entries by their directory's mtime, which moves while frames are being written.
+        
+        Args:
+            keep: Entry never evicted (the one just written)
+        """
+        entries = []
+        total = 0
+        try:
+            with os.scandir(FRAME_CACHE_DIR) as it:
+                for entry in it:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+                    try:
+                        with os.scandir(entry.path) as files:
+                            size = sum(f.stat().st_size for f in files if f.is_file(follow_symlinks=False))
+                        try:
+                            last_used = os.stat(os.path.join(entry.path, FRAME_CACHE_MARKER)).st_mtime
+                        except FileNotFoundError:
+                            last_used = entry.stat().st_mtime
+                    except FileNotFoundError:
+                        # Evicted by another process while scanning
+                        continue
+                    entries.append((last_used, size, entry.path))
+                    total += size
+        except OSError as e:
+            logger.warning(f"Could not scan frame cache {FRAME_CACHE_DIR}: {str(e)}")
+            return
+        
+        entries.sort()
+        for _, size, path in entries:
+            if total <= FRAME_CACHE_MAX_BYTES:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            logger.info(f"Evicted frame cache entry {path} ({size} bytes)")
+    
+    def _encode_frames_pipelined(self, video_path: str, granularity_seconds: float) -> Iterator[Tuple[int, float, bytes]]:
+        """
+        Decode and JPEG encode frames on background threads
+        
+        A reader thread decodes frames and PIPELINE_ENCODER_THREADS threads encode them,
+        joined by bounded queues, so decoding, encoding and whatever the caller does with
+        each frame overlap and only a few frames are held in memory. Frames are yielded
+        in completion order, which is not always frame order.
+        
+        Args:
+            video_path: Path to video file
+            granularity_seconds: Interval between frames
+            
+        Yields:
+            Tuples of (frame_number, timestamp, frame_bytes)
+        """
+        read_queue = queue.Queue(maxsize=PIPELINE_PREFETCH)
+        write_queue = queue.Queue(maxsize=PIPELINE_PREFETCH)
+        stop_event = threading.Event()
+        
+        def put(q: queue.Queue, item) -> bool:
+            """Put item on a bounded queue, giving up once the pipeline is stopped"""
+            while not stop_event.is_set():
+                try:
+                    q.put(item, timeout=1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def get(q: queue.Queue):
+            """Get an item from a queue, returning None once the pipeline is stopped"""
+            while not stop_event.is_set():
+                try:
+                    return q.get(timeout=1)
+                except queue.Empty:
+                    continue
+            return None
+        
+        def read_frames():
+            try:
+                for item in self.decode_frames_by_granularity_iter(video_path, granularity_seconds):
+                    if not put(read_queue, item):
+                        return
+            except Exception as e:
+                put(write_queue, e)
+            finally:
+                for _ in range(PIPELINE_ENCODER_THREADS):
+                    put(read_queue, None)
+        
+        def encode_frames():
+            while (item := get(read_queue)) is not None:
+                frame_num, timestamp, frame = item
+                try:
+                    item = (frame_num, timestamp, self.encode_frame(frame))
+                except Exception as e:
+                    item = e
+                if not put(write_queue, item):
+                    return
+            put(write_queue, None)
+        
+        threads = [threading.Thread(target=read_frames, daemon=True, name="Frame-reader")]
+        threads += [
+            threading.Thread(target=encode_frames, daemon=True, name=f"Frame-encoder-{i+1}")
+            for i in range(PIPELINE_ENCODER_THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        
+        try:
+            finished_encoders = 0
+            while finished_encoders < PIPELINE_ENCODER_THREADS:
+                item = write_queue.get()
+                if item is None:
+                    finished_encoders += 1
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+                del item
+        finally:
+            stop_event.set()
+            for thread in threads:
+                thread.join(timeout=5)
+    
+    def _process_frames(self, frames: Iterator[Tuple[int, float, bytes]], prompt: str) -> List[Dict]:
+        """
+        Send frames to a pool of PROCESS_VIDEO_CONCURRENCY LLM calls as they arrive
+        
+        Frames are grouped PROCESS_VIDEO_BATCH_SIZE at a time into one multi-image request
+        (VideoIndex.process_images); if a batched call fails, its frames are retried one
+        request per frame.
+        
+        Args:
+            frames: Iterator of (frame_number, timestamp, frame_bytes) tuples
+            prompt: Prompt for LLM
+            
+        Returns:
+            List of processing results for each frame, in frame order
+        """
+        # Storage key for uploaded frames (process_video has no video_id)
+        run_id = f"process_video/{os.urandom(8).hex()}"
+        
+        def process_image(image_url: str):
+            try:
+                return self.video_index.process_image_from_url(image_url, prompt)
+            except Exception as e:
+                return e
+        
+        def process_batch(batch: List[Tuple[int, float, bytes]]) -> List[Dict]:
+            answers = []
+            for frame_num, _, frame_bytes in batch:
+                try:
+                    answers.append(self.frame_to_image_url_sync(run_id, frame_num, frame_bytes))
+                except Exception as e:
+                    answers.append(e)
+            
+            uploaded = [i for i, answer in enumerate(answers) if not isinstance(answer, Exception)]
+            image_urls = [answers[i] for i in uploaded]
+            if image_urls:
+                try:
+                    batch_results = self.video_index.process_images(image_urls, prompt)
+                except Exception as e:
+                    # Fall back to one request per frame so a bad batch doesn't fail every frame
+                    logger.warning(f"Batched LLM call for {len(image_urls)} frames failed, retrying individually: {str(e)}")
+                    batch_results = [process_image(image_url) for image_url in image_urls]
+                for i, result in zip(uploaded, batch_results):
+                    answers[i] = result
+                # The LLM has read the frames; drop the copies uploaded to storage
+                Database.delete_frame_uploads_sync(run_id, [
+                    batch[i][0] for i, image_url in zip(uploaded, image_urls) if not image_url.startswith("data:")
+                ])
+            
+            results = []
+            for (frame_num, timestamp, _), answer in zip(batch, answers):
+                if isinstance(answer, Exception):
+                    logger.error(f"Error processing frame {frame_num}: {str(answer)}")
+                    results.append({
+                        "frame_number": frame_num,
+                        "timestamp": timestamp,
+                        "error": str(answer)
+                    })
+                else:
+                    results.append({
+                        "frame_number": frame_num,
+                        "timestamp": timestamp,
+                        "result": answer
+                    })
+            return results
+        
+        # Cap batches waiting on or in LLM calls so the pool can't buffer the whole video
+        in_flight = threading.BoundedSemaphore(PROCESS_VIDEO_CONCURRENCY + 1)
+        futures = []
+        
+        def submit(batch: List[Tuple[int, float, bytes]]):
+            in_flight.acquire()
+            future = executor.submit(process_batch, batch)
+            future.add_done_callback(lambda _: in_flight.release())
+            futures.append(future)
+        
+        with ThreadPoolExecutor(max_workers=PROCESS_VIDEO_CONCURRENCY) as executor:
+            batch = []
+            for item in frames:
+                batch.append(item)
+                del item
+                if len(batch) >= PROCESS_VIDEO_BATCH_SIZE:
+                    submit(batch)
+                    batch = []
+            if batch:
+                submit(batch)
+        
+        results = [result for future in futures for result in future.result()]
+        results.sort(key=lambda result: result["frame_number"])
+        return results
@@ -68,12 +68,10 @@ def download_schema_python():
 def get_table_list():
     """Get list of tables from Supabase"""
     try:
-        from app.database import get_supabase_client
-        
-        client = get_supabase_client()
+        from app.database import probe_tables
         
-        # Try to query information_schema (this might not work with Supabase client)
-        # Instead, we'll try to detect tables by attempting to query them
+        # information_schema isn't reachable through the Supabase client, so detect
+        # tables by querying them (all probes run concurrently)
         
         print("🔍 Detecting existing tables...")
         print("=" * 60)
@@ -90,12 +88,11 @@ def get_table_list():
         ]
         
         existing_tables = []
-        for table in known_tables:
-            try:
-                result = client.table(table).select("id").limit(1).execute()
+        for table, e in probe_tables(known_tables).items():
+            if e is None:
                 existing_tables.append(table)
                 print(f"✅ {table} - exists")
-            except Exception as e:
+            else:
                 if "not found" in str(e).lower() or "PGRST205" in str(e):
                     print(f"❌ {table} - missing")
                 else:
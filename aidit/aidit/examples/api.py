@@ -5,13 +5,20 @@ from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Union, Dict, Any
-import requests
+import httpx
 import os
+import asyncio
 import base64
-from io import BytesIO
-from PIL import Image
 from dotenv import load_dotenv
 
+try:
+    # SIMD (AVX2/AVX-512/NEON) base64 codec, several times faster than the stdlib on large images
+    from pybase64 import b64encode_as_string
+except ImportError:
+    def b64encode_as_string(data: bytes) -> str:
+        """Base64 encode bytes straight to an ASCII str (stdlib fallback)"""
+        return base64.b64encode(data).decode('ascii')
+
 # Load environment variables
 load_dotenv()
 
@@ -39,6 +46,7 @@ OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
 DEFAULT_MODEL = "microsoft/phi-4"
 
 
+
 class Message(BaseModel):
     role: str  # "user", "assistant", or "system"
     content: Union[str, List[Dict[str, Any]]]  # Can be text or multimodal content
@@ -57,6 +65,22 @@ class ChatResponse(BaseModel):
     usage: Optional[dict] = None
 
 
+@app.on_event("startup")
+async def startup():
+    """Create one async HTTP/2 client for all OpenRouter calls (reuses warm TLS connections)"""
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=120,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=32)
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close pooled OpenRouter connections"""
+    await app.state.http.aclose()
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -75,26 +99,36 @@ async def get_models():
             "Authorization": f"Bearer {OPENROUTER_API_KEY}",
             "Content-Type": "application/json",
         }
-        response = requests.get("https://openrouter.ai/api/v1/models", headers=headers)
+        response = await app.state.http.get("https://openrouter.ai/api/v1/models", headers=headers)
         response.raise_for_status()
         return response.json()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching models: {str(e)}")
 
 
+# Leading magic bytes -> MIME type, so the image type is known without decoding it
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+def sniff_image_mime_type(image_file: bytes) -> str:
+    """Detect image MIME type from the file signature (defaults to image/jpeg)"""
+    for signature, mime_type in IMAGE_SIGNATURES:
+        if image_file.startswith(signature):
+            return mime_type
+    if image_file[:4] == b'RIFF' and image_file[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/jpeg'
+
+
 def encode_image_to_base64(image_file: bytes) -> str:
     """Convert image bytes to base64 data URL"""
-    base64_image = base64.b64encode(image_file).decode('utf-8')
-    # Try to detect image type
-    img = Image.open(BytesIO(image_file))
-    format_map = {
-        'JPEG': 'image/jpeg',
-        'PNG': 'image/png',
-        'GIF': 'image/gif',
-        'WEBP': 'image/webp'
-    }
-    img_format = format_map.get(img.format, 'image/jpeg')
-    return f"data:{img_format};base64,{base64_image}"
+    base64_image = b64encode_as_string(image_file)
+    return f"data:{sniff_image_mime_type(image_file)};base64,{base64_image}"
 
 
 @app.post("/chat", response_model=ChatResponse)
@@ -150,7 +184,7 @@ async def chat(request: ChatRequest):
             "max_tokens": request.max_tokens,
         }
         
-        response = requests.post(OPENROUTER_URL, headers=headers, json=data, timeout=120)
+        response = await app.state.http.post(OPENROUTER_URL, headers=headers, json=data, timeout=120)
         response.raise_for_status()
         
         result = response.json()
@@ -168,7 +202,7 @@ async def chat(request: ChatRequest):
         else:
             raise HTTPException(status_code=500, detail="No response from model")
             
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"OpenRouter API error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -194,7 +228,8 @@ async def chat_with_image(
     try:
         # Read and encode the image
         image_bytes = await image.read()
-        base64_image = encode_image_to_base64(image_bytes)
+        # Base64 of a large image is CPU work; keep it off the event loop
+        base64_image = await asyncio.to_thread(encode_image_to_base64, image_bytes)
         
         # Prepare the message with image
         messages = [
@@ -222,7 +257,7 @@ async def chat_with_image(
             "max_tokens": max_tokens,
         }
         
-        response = requests.post(OPENROUTER_URL, headers=headers, json=data, timeout=120)
+        response = await app.state.http.post(OPENROUTER_URL, headers=headers, json=data, timeout=120)
         response.raise_for_status()
         
         result = response.json()
@@ -236,7 +271,7 @@ async def chat_with_image(
         else:
             raise HTTPException(status_code=500, detail="No response from model")
             
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"OpenRouter API error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -262,7 +297,7 @@ async def chat_simple(message: str, model: Optional[str] = DEFAULT_MODEL):
             ],
         }
         
-        response = requests.post(OPENROUTER_URL, headers=headers, json=data, timeout=60)
+        response = await app.state.http.post(OPENROUTER_URL, headers=headers, json=data, timeout=60)
         response.raise_for_status()
         
         result = response.json()
@@ -275,7 +310,7 @@ async def chat_simple(message: str, model: Optional[str] = DEFAULT_MODEL):
         else:
             raise HTTPException(status_code=500, detail="No response from model")
             
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"OpenRouter API error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -329,7 +364,7 @@ async def chat_with_base64_image(
             "max_tokens": max_tokens,
         }
         
-        response = requests.post(OPENROUTER_URL, headers=headers, json=data, timeout=120)
+        response = await app.state.http.post(OPENROUTER_URL, headers=headers, json=data, timeout=120)
         response.raise_for_status()
         
         result = response.json()
@@ -343,7 +378,7 @@ async def chat_with_base64_image(
         else:
             raise HTTPException(status_code=500, detail="No response from model")
             
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"OpenRouter API error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
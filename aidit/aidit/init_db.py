@@ -54,9 +54,7 @@ def init_tables():
 def check_tables():
     """Check if tables exist in Supabase"""
     try:
-        from app.database import get_supabase_client
-        
-        client = get_supabase_client()
+        from app.database import probe_tables
         
         # List of tables to check
         tables = [
@@ -73,12 +71,11 @@ def check_tables():
         print("=" * 60)
         
         missing_tables = []
-        for table in tables:
-            try:
-                # Try to select from table (will fail if table doesn't exist)
-                result = client.table(table).select("id").limit(1).execute()
+        # Select from every table at once (fails for tables that don't exist)
+        for table, e in probe_tables(tables).items():
+            if e is None:
                 print(f"✅ {table} - exists")
-            except Exception as e:
+            else:
                 if "not found" in str(e).lower() or "PGRST205" in str(e):
                     print(f"❌ {table} - missing")
                     missing_tables.append(table)
@@ -0,0 +1,8 @@
+-- Migration: Store a perceptual hash per frame
+-- Run this in your Supabase SQL Editor.
+-- Written by the background video processor, which skips LLM calls for frames
+-- nearly identical to the previous one; indexed for deduplication across videos.
+
+ALTER TABLE frames ADD COLUMN IF NOT EXISTS phash BIGINT;
+
+CREATE INDEX IF NOT EXISTS idx_frames_phash ON frames(phash);
@@ -0,0 +1,47 @@
+-- Migration: Resolve batch media items in one call
+-- Run this in your Supabase SQL Editor. Used by Database.batch_resolve_media:
+-- joins attachments to media, creates missing media rows, and returns the
+-- storage path, public URL and media.id for every requested message_id.
+
+-- Percent-encode a storage path the way Python's urllib.parse.quote(path, safe='/') does
+CREATE OR REPLACE FUNCTION url_quote_path(p_path TEXT)
+RETURNS TEXT AS $$
+    SELECT COALESCE(string_agg(
+        CASE WHEN c ~ '^[-A-Za-z0-9_.~/]$' THEN c
+             ELSE upper(regexp_replace(encode(convert_to(c, 'UTF8'), 'hex'), '(..)', '%\1', 'g'))
+        END, '' ORDER BY n), '')
+    FROM regexp_split_to_table(p_path, '') WITH ORDINALITY AS t(c, n);
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+CREATE OR REPLACE FUNCTION batch_resolve_media(p_ids TEXT[], p_public_prefix TEXT)
+RETURNS TABLE(message_id TEXT, storage_path TEXT, public_url TEXT, media_id BIGINT, media_type TEXT, video_url TEXT) AS $$
+    WITH resolved AS (
+        SELECT DISTINCT ON (a.message_id::TEXT)
+            a.message_id::TEXT AS message_id,
+            a.storage_path,
+            p_public_prefix || url_quote_path(a.storage_path) AS public_url
+        FROM attachments a
+        WHERE a.message_id::TEXT = ANY(p_ids)
+          AND a.storage_path IS NOT NULL
+    ),
+    inserted AS (
+        INSERT INTO media (video_id, video_url, media_type)
+        SELECT
+            r.message_id,
+            r.public_url,
+            CASE WHEN lower(r.storage_path) ~ '\.(jpg|jpeg|png|gif|webp|bmp|svg)$' THEN 'image' ELSE 'video' END
+        FROM resolved r
+        ON CONFLICT (video_id) DO NOTHING
+        RETURNING id, video_id, media_type, video_url
+    )
+    SELECT
+        r.message_id,
+        r.storage_path,
+        r.public_url,
+        COALESCE(i.id, m.id),
+        COALESCE(i.media_type, m.media_type),
+        COALESCE(i.video_url, m.video_url)
+    FROM resolved r
+    LEFT JOIN inserted i ON i.video_id = r.message_id
+    LEFT JOIN media m ON m.video_id = r.message_id;
+$$ LANGUAGE sql;
@@ -0,0 +1,19 @@
+-- Migration: Update the most recent image_processing row in one round-trip
+-- Run this in your Supabase SQL Editor. Used by Database.update_image_processing
+-- (previously a SELECT ... ORDER BY created_at DESC LIMIT 1 followed by an UPDATE).
+
+CREATE OR REPLACE FUNCTION update_latest_image_processing(p_video_id TEXT, p_patch JSONB)
+RETURNS SETOF image_processing AS $$
+    UPDATE image_processing
+    SET status = COALESCE(p_patch->>'status', status),
+        prompt = CASE WHEN p_patch ? 'prompt' THEN p_patch->>'prompt' ELSE prompt END,
+        model = COALESCE(p_patch->>'model', model),
+        llm_response = CASE WHEN p_patch ? 'llm_response' THEN p_patch->>'llm_response' ELSE llm_response END
+    WHERE id = (
+        SELECT id FROM image_processing
+        WHERE video_id = p_video_id
+        ORDER BY created_at DESC
+        LIMIT 1
+    )
+    RETURNING *;
+$$ LANGUAGE sql;
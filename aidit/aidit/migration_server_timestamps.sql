@@ -0,0 +1,32 @@
+-- Migration: Let Postgres own created_at/updated_at
+-- Run this in your Supabase SQL Editor. The app no longer sends timestamps,
+-- so columns default to NOW() on insert and a trigger bumps updated_at on update.
+
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['media', 'video_processing', 'image_processing', 'frames', 'scene_indexes', 'transcriptions']
+    LOOP
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN created_at SET DEFAULT NOW()', t);
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN updated_at SET DEFAULT NOW()', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_updated_at ON %I', t, t);
+        EXECUTE format('CREATE TRIGGER trg_%s_updated_at BEFORE UPDATE ON %I FOR EACH ROW EXECUTE FUNCTION set_updated_at()', t, t);
+    END LOOP;
+END $$;
+
+ALTER TABLE processing_logs ALTER COLUMN created_at SET DEFAULT NOW();
+
+-- Verify the triggers were created
+SELECT event_object_table, trigger_name
+FROM information_schema.triggers
+WHERE trigger_name LIKE 'trg_%_updated_at'
+ORDER BY event_object_table;
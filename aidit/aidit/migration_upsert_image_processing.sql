@@ -0,0 +1,23 @@
+-- Migration: Update-or-insert image_processing in one round-trip
+-- Run this in your Supabase SQL Editor after migration_image_processing_rpc.sql.
+-- Used by Database.upsert_image_processing (previously a get_image_processing
+-- round-trip followed by update_image_processing or create_image_processing).
+
+CREATE OR REPLACE FUNCTION upsert_image_processing(p_video_id TEXT, p_patch JSONB)
+RETURNS SETOF image_processing AS $$
+BEGIN
+    RETURN QUERY SELECT * FROM update_latest_image_processing(p_video_id, p_patch);
+    IF NOT FOUND THEN
+        RETURN QUERY
+        INSERT INTO image_processing (video_id, status, prompt, model, llm_response)
+        VALUES (
+            p_video_id,
+            COALESCE(p_patch->>'status', 'completed'),
+            COALESCE(p_patch->>'prompt', 'What''s in this image?'),
+            COALESCE(p_patch->>'model', 'google/gemini-2.0-flash-001'),
+            COALESCE(p_patch->>'llm_response', '')
+        )
+        RETURNING *;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
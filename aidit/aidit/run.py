@@ -5,7 +5,8 @@ import uvicorn
 from app.main import app
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    # uvloop/httptools ship with uvicorn[standard]
+    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True, loop="uvloop", http="httptools")
 
 
 
@@ -55,6 +55,7 @@ CREATE TABLE IF NOT EXISTS frames (
     status TEXT NOT NULL DEFAULT 'pending',
     llm_response TEXT,
     error_message TEXT,
+    phash BIGINT,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     UNIQUE(video_id, frame_number)
@@ -62,6 +63,7 @@ CREATE TABLE IF NOT EXISTS frames (
 
 CREATE INDEX IF NOT EXISTS idx_frames_video_id ON frames(video_id);
 CREATE INDEX IF NOT EXISTS idx_frames_frame_number ON frames(frame_number);
+CREATE INDEX IF NOT EXISTS idx_frames_phash ON frames(phash);
 
 -- Scene Indexes table
 CREATE TABLE IF NOT EXISTS scene_indexes (
@@ -163,3 +165,109 @@ CREATE INDEX IF NOT EXISTS idx_processing_logs_video_id ON processing_logs(video
 CREATE INDEX IF NOT EXISTS idx_processing_logs_frame_id ON processing_logs(frame_id);
 CREATE INDEX IF NOT EXISTS idx_processing_logs_created_at ON processing_logs(created_at);
 
+
+-- Keep updated_at current on every UPDATE (the app does not send timestamps)
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['media', 'video_processing', 'image_processing', 'frames', 'scene_indexes', 'transcriptions']
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_updated_at ON %I', t, t);
+        EXECUTE format('CREATE TRIGGER trg_%s_updated_at BEFORE UPDATE ON %I FOR EACH ROW EXECUTE FUNCTION set_updated_at()', t, t);
+    END LOOP;
+END $$;
+
+-- Update the most recent image_processing row for a video_id in one statement
+CREATE OR REPLACE FUNCTION update_latest_image_processing(p_video_id TEXT, p_patch JSONB)
+RETURNS SETOF image_processing AS $$
+    UPDATE image_processing
+    SET status = COALESCE(p_patch->>'status', status),
+        prompt = CASE WHEN p_patch ? 'prompt' THEN p_patch->>'prompt' ELSE prompt END,
+        model = COALESCE(p_patch->>'model', model),
+        llm_response = CASE WHEN p_patch ? 'llm_response' THEN p_patch->>'llm_response' ELSE llm_response END
+    WHERE id = (
+        SELECT id FROM image_processing
+        WHERE video_id = p_video_id
+        ORDER BY created_at DESC
+        LIMIT 1
+    )
+    RETURNING *;
+$$ LANGUAGE sql;
+
+-- Update the most recent image_processing row for a video_id, or insert one if none exists
+CREATE OR REPLACE FUNCTION upsert_image_processing(p_video_id TEXT, p_patch JSONB)
+RETURNS SETOF image_processing AS $$
+BEGIN
+    RETURN QUERY SELECT * FROM update_latest_image_processing(p_video_id, p_patch);
+    IF NOT FOUND THEN
+        RETURN QUERY
+        INSERT INTO image_processing (video_id, status, prompt, model, llm_response)
+        VALUES (
+            p_video_id,
+            COALESCE(p_patch->>'status', 'completed'),
+            COALESCE(p_patch->>'prompt', 'What''s in this image?'),
+            COALESCE(p_patch->>'model', 'google/gemini-2.0-flash-001'),
+            COALESCE(p_patch->>'llm_response', '')
+        )
+        RETURNING *;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Percent-encode a storage path the way Python's urllib.parse.quote(path, safe='/') does
+CREATE OR REPLACE FUNCTION url_quote_path(p_path TEXT)
+RETURNS TEXT AS $$
+    SELECT COALESCE(string_agg(
+        CASE WHEN c ~ '^[-A-Za-z0-9_.~/]$' THEN c
+             ELSE upper(regexp_replace(encode(convert_to(c, 'UTF8'), 'hex'), '(..)', '%\1', 'g'))
+        END, '' ORDER BY n), '')
+    FROM regexp_split_to_table(p_path, '') WITH ORDINALITY AS t(c, n);
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+-- Resolve batch media items in one call: joins attachments to media, creates missing
+-- media rows, and returns the storage path, public URL and media.id per message_id.
+-- attachments (message attachments) is managed outside this schema,
+-- so the body is only checked when the function is first called.
+SET check_function_bodies = off;
+CREATE OR REPLACE FUNCTION batch_resolve_media(p_ids TEXT[], p_public_prefix TEXT)
+RETURNS TABLE(message_id TEXT, storage_path TEXT, public_url TEXT, media_id BIGINT, media_type TEXT, video_url TEXT) AS $$
+    WITH resolved AS (
+        SELECT DISTINCT ON (a.message_id::TEXT)
+            a.message_id::TEXT AS message_id,
+            a.storage_path,
+            p_public_prefix || url_quote_path(a.storage_path) AS public_url
+        FROM attachments a
+        WHERE a.message_id::TEXT = ANY(p_ids)
+          AND a.storage_path IS NOT NULL
+    ),
+    inserted AS (
+        INSERT INTO media (video_id, video_url, media_type)
+        SELECT
+            r.message_id,
+            r.public_url,
+            CASE WHEN lower(r.storage_path) ~ '\.(jpg|jpeg|png|gif|webp|bmp|svg)$' THEN 'image' ELSE 'video' END
+        FROM resolved r
+        ON CONFLICT (video_id) DO NOTHING
+        RETURNING id, video_id, media_type, video_url
+    )
+    SELECT
+        r.message_id,
+        r.storage_path,
+        r.public_url,
+        COALESCE(i.id, m.id),
+        COALESCE(i.media_type, m.media_type),
+        COALESCE(i.video_url, m.video_url)
+    FROM resolved r
+    LEFT JOIN inserted i ON i.video_id = r.message_id
+    LEFT JOIN media m ON m.video_id = r.message_id;
+$$ LANGUAGE sql;
+RESET check_function_bodies;
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Quick migration script to add composite indexes to the ai_edit_jobs table.
+Run this once to add the indexes to your database.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import text
+from app.database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# (video_id, id) for job lookups, (video_id, created_at DESC) for listing a video's jobs
+INDEX_STATEMENTS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ai_edit_jobs_video_id_id ON ai_edit_jobs(video_id, id);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ai_edit_jobs_video_created ON ai_edit_jobs(video_id, created_at DESC);",
+]
+
+def add_ai_edit_jobs_indexes():
+    """Add composite indexes to ai_edit_jobs without locking out writes"""
+    logger.info("Adding composite indexes to ai_edit_jobs table...")
+    
+    try:
+        # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for sql in INDEX_STATEMENTS:
+                conn.execute(text(sql))
+            logger.info("✅ Successfully added indexes!")
+            return True
+    except Exception as e:
+        logger.error(f"❌ Error adding indexes: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Adding composite indexes to ai_edit_jobs table")
+    print("=" * 60)
+    print()
+    
+    success = add_ai_edit_jobs_indexes()
+    
+    if success:
+        print("\n✅ Migration completed successfully!")
+        sys.exit(0)
+    else:
+        print("\n❌ Migration failed. Please check the error above.")
+        sys.exit(1)
@@ -3,10 +3,11 @@ AI Edit API Endpoints
 Handles AI-driven storytelling edit generation
 """
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
-from app.database import get_db
+from sqlalchemy import select, and_, cast, Text
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, List, Dict, Any, Tuple, Union
+from pydantic import BaseModel, ConfigDict, Field
+from app.database import get_async_db
 from app.models.ai_edit_job import AIEditJob, AIEditJobStatus
 from app.models.edit_job import EditJob, EditJobStatus
 from app.models.media import Media
@@ -15,31 +16,49 @@ from app.services.ai.data_loader import DataLoader
 from app.services.ai.storytelling_agent import StorytellingAgent
 from app.services.ai.edl_converter import EDLConverter
 from app.services.editor import EditorService
+from app.workers.tasks import (
+    generate_and_apply_ai_edit_pipeline,
+    generate_ai_edit_task_standalone,
+    apply_ai_edit_task
+)
+from collections import OrderedDict
 from datetime import datetime
 import logging
+import json
+import uuid
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
 # Pydantic models
+class StoryArc(BaseModel):
+    """Story structure; keys not listed here are passed through to the prompt"""
+    model_config = ConfigDict(extra="allow")
+    
+    hook: str = "Grab attention in first 3 seconds"
+    build: str = "Build interest and context"
+    climax: str = "Main point/revelation"
+    resolution: str = "Conclusion/call-to-action"
+
+class StylePrefs(BaseModel):
+    """Editing style; keys not listed here are passed through to the prompt"""
+    model_config = ConfigDict(extra="allow")
+    
+    pacing: str = "moderate"
+    transitions: str = "smooth"
+    emphasis: str = "balanced"
+
 class StoryPromptInput(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
     target_audience: Optional[str] = "general"
-    story_arc: Optional[dict] = {
-        "hook": "Grab attention in first 3 seconds",
-        "build": "Build interest and context",
-        "climax": "Main point/revelation",
-        "resolution": "Conclusion/call-to-action"
-    }
+    story_arc: Optional[StoryArc] = Field(default_factory=StoryArc)
     tone: Optional[str] = "educational"  # educational, entertaining, dramatic, inspirational
     key_message: Optional[str] = ""
     desired_length_percentage: Optional[float] = 50.0  # 25-100, percentage of original video length
     desired_length: Optional[str] = None  # DEPRECATED: Use desired_length_percentage instead (short=30%, medium=50%, long=85%)
-    style_preferences: Optional[dict] = {
-        "pacing": "moderate",
-        "transitions": "smooth",
-        "emphasis": "balanced"
-    }
+    style_preferences: Optional[StylePrefs] = Field(default_factory=StylePrefs)
 
 class FrameLevelData(BaseModel):
     """Frame-level data from the new format"""
@@ -75,25 +94,21 @@ class TranscriptionLevelData(BaseModel):
 
 class SummaryResult(BaseModel):
     """Single video result from summary.results array"""
+    model_config = ConfigDict(extra="allow")  # Allow extra fields that might be in the JSON
+    
     media_id: str  # This is the video ID (mapped to video_id internally)
     video_url: str
     frame_level_data: Optional[List[FrameLevelData]] = []
     scene_level_data: Optional[SceneLevelData] = None
     transcription_level_data: Optional[TranscriptionLevelData] = None
-    
-    class Config:
-        # Allow extra fields that might be in the JSON
-        extra = "allow"
 
 class SummaryInput(BaseModel):
     """Summary input matching the new format"""
+    model_config = ConfigDict(extra="allow")  # Allow extra fields that might be in the JSON
+    
     success: Optional[bool] = True
     message_ids: Optional[List[str]] = []
     results: Optional[List[SummaryResult]] = []  # Array of video data
-    
-    class Config:
-        # Allow extra fields that might be in the JSON
-        extra = "allow"
 
 class VideoDataInput(BaseModel):
     """Complete video data provided in request (no database needed) - LEGACY FORMAT"""
@@ -107,6 +122,8 @@ class VideoDataInput(BaseModel):
 
 class GenerateAIEditRequest(BaseModel):
     """Request model matching the new JSON format"""
+    model_config = ConfigDict(extra="allow")  # Allow extra fields for flexibility
+    
     summary: Optional[SummaryInput] = None  # New format: Contains results array with video data
     story_prompt: Optional[StoryPromptInput] = None
     callback_url: Optional[str] = None
@@ -117,14 +134,59 @@ class GenerateAIEditRequest(BaseModel):
     
     # Legacy fields for backward compatibility
     videos_data: Optional[List[VideoDataInput]] = None  # DEPRECATED: Use summary.results instead
-    
-    class Config:
-        # Allow extra fields for flexibility
-        extra = "allow"
 
 
-@router.get("/{video_id}/ai-edit/data")
-async def get_ai_edit_data(video_id: str, db: Session = Depends(get_db)):
+# Response models (FastAPI serializes these with pydantic-core's prebuilt serializer)
+# Timestamps are Union[datetime, str]: tables created by create_ai_edit_jobs_table.py
+# store them as VARCHAR
+Timestamp = Optional[Union[datetime, str]]
+
+class DataAvailability(BaseModel):
+    count: int
+    has_data: bool
+
+class TranscriptionAvailability(BaseModel):
+    status: Optional[str] = None
+    segment_count: int
+    has_data: bool
+
+class AIEditDataResponse(BaseModel):
+    video_id: str
+    media: Optional[Dict[str, Any]] = None
+    transcription: TranscriptionAvailability
+    frames: DataAvailability
+    scenes: DataAvailability
+    video_duration: Optional[float] = 0.0
+
+class AIEditPlanResponse(BaseModel):
+    job_id: str
+    status: Optional[AIEditJobStatus] = None
+    summary: Optional[Dict[str, Any]] = None
+    story_prompt: Optional[Dict[str, Any]] = None
+    llm_plan: Optional[Dict[str, Any]] = None
+    compression_metadata: Optional[Dict[str, Any]] = None
+    validation_errors: Optional[Any] = None  # List of messages or dict, depending on the validator
+    llm_usage: Optional[Dict[str, Any]] = None
+    error_message: Optional[str] = None
+    created_at: Timestamp = None
+    started_at: Timestamp = None
+    completed_at: Timestamp = None
+
+class AIEditJobListItem(BaseModel):
+    id: str
+    status: Optional[AIEditJobStatus] = None
+    created_at: Timestamp = None
+    completed_at: Timestamp = None
+    has_plan: bool
+    has_output: bool
+
+class ListAIEditJobsResponse(BaseModel):
+    video_id: str
+    jobs: List[AIEditJobListItem]
+
+
+@router.get("/{video_id}/ai-edit/data", response_model=AIEditDataResponse)
+async def get_ai_edit_data(video_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Load all data needed for AI editing (media, transcription, frames, scenes).
     
@@ -132,14 +194,15 @@ async def get_ai_edit_data(video_id: str, db: Session = Depends(get_db)):
     not the videos table. This is for AI editing use case.
     """
     # Load data from Supabase tables (media table is source of truth)
-    data_loader = DataLoader(db)
+    # DataLoader is synchronous; run_sync hands it a Session bound to this async connection
+    data_loader = DataLoader(None)
     try:
-        data = data_loader.load_all_data(video_id)
+        data = await db.run_sync(lambda session: DataLoader(session).load_all_data(video_id))
     except ValueError as e:
-        db.rollback()  # Rollback on error
+        await db.rollback()  # Rollback on error
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        db.rollback()  # Rollback on error
+        await db.rollback()  # Rollback on error
         logger.error(f"Error loading data: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to load data: {str(e)}")
     
@@ -148,8 +211,9 @@ async def get_ai_edit_data(video_id: str, db: Session = Depends(get_db)):
     transcript_segments = data_loader.extract_transcript_segments(transcription) if transcription else []
     
     # Get media record for video URL
-    from app.models.media import Media
-    media_record = db.query(Media).filter(Media.video_id == video_id).first()
+    media_record = (await db.execute(
+        select(Media).where(Media.video_id == video_id).limit(1)
+    )).scalars().first()
     media_dict = data.get("media", {})
     if media_record:
         # Ensure video_url and original_path are included
@@ -194,7 +258,6 @@ async def generate_ai_edit(
         video_id: Primary video ID (for job tracking, can be any identifier)
         request: Complete request with videos_data containing all video information
     """
-    import json
     
     # Log the complete incoming request for debugging
     try:
@@ -299,7 +362,7 @@ async def generate_ai_edit(
     
     elif request.videos_data and len(request.videos_data) > 0:
         # LEGACY FORMAT: Use videos_data
-        videos_data = [v.dict() for v in request.videos_data]
+        videos_data = [v.model_dump() for v in request.videos_data]
         video_ids = [v["video_id"] for v in videos_data]
     else:
         raise HTTPException(
@@ -316,8 +379,6 @@ async def generate_ai_edit(
     is_multi_video = len(videos_data) > 1
     
     # Process provided data (no database queries)
-    from app.services.ai.data_loader import DataLoader
-    
     # Extract data from provided videos_data
     all_frames = []
     all_scenes = []
@@ -416,68 +477,31 @@ async def generate_ai_edit(
         logger.info(f"Sample frame keys: {list(sample_frame.keys())}, has description: {bool(sample_frame.get('description'))}, has llm_response: {bool(sample_frame.get('llm_response'))}, has status: {bool(sample_frame.get('status'))}")
     
     # Prepare summary (handle new format vs legacy format)
-    if request.summary:
-        summary_dict = request.summary.dict()
-        # New format has success, message_ids, results - extract useful info
-        # For backward compatibility, create a summary structure
-        summary = {
-            "success": summary_dict.get("success", True),
-            "message_ids": summary_dict.get("message_ids", []),
-            "video_summary": "",  # Extract from results if needed
-            "key_moments": [],
-            "content_type": "presentation",
-            "main_topics": [],
-            "speaker_style": "casual",
-            "results_count": len(summary_dict.get("results", []))
-        }
-    else:
-        # Fallback to defaults
-        summary = {
-            "success": True,
-            "message_ids": [],
-        "video_summary": "",
+    # New format has success, message_ids, results - extract useful info; read the fields
+    # directly rather than dumping the whole model (results carries every frame and scene)
+    summary_input = request.summary or SummaryInput()
+    # For backward compatibility, create a summary structure
+    summary = {
+        "success": summary_input.success,
+        "message_ids": summary_input.message_ids,
+        "video_summary": "",  # Extract from results if needed
         "key_moments": [],
         "content_type": "presentation",
         "main_topics": [],
-            "speaker_style": "casual",
-            "results_count": 0
+        "speaker_style": "casual",
+        "results_count": len(summary_input.results or [])
     }
     
-    # Prepare story prompt (handle missing/partial data)
-    story_prompt = request.story_prompt.dict() if request.story_prompt else {}
-    # Merge with defaults for missing fields
-    default_story_prompt = {
-        "target_audience": "general",
-        "story_arc": {
-            "hook": "Grab attention in first 3 seconds",
-            "build": "Build interest and context",
-            "climax": "Main point/revelation",
-            "resolution": "Conclusion/call-to-action"
-        },
-        "tone": "educational",
-        "key_message": "",
-        "desired_length": "medium",
-        "style_preferences": {
-            "pacing": "moderate",
-            "transitions": "smooth",
-            "emphasis": "balanced"
-        }
-    }
-    # Deep merge for nested dicts
-    if "story_arc" in story_prompt:
-        story_prompt["story_arc"] = {**default_story_prompt["story_arc"], **story_prompt["story_arc"]}
-    if "style_preferences" in story_prompt:
-        story_prompt["style_preferences"] = {**default_story_prompt["style_preferences"], **story_prompt["style_preferences"]}
-    story_prompt = {**default_story_prompt, **story_prompt}  # User values override defaults
+    # Prepare story prompt; missing fields (including nested story_arc/style_preferences
+    # keys) are filled in by the model's defaults
+    story_prompt = (request.story_prompt or StoryPromptInput()).model_dump()
     
     # Create job ID (UUID, no database needed)
-    import uuid
     job_id = str(uuid.uuid4())
     
     # Check if auto_apply is enabled
     if request.auto_apply:
         # Pipeline: Generate -> Apply -> Save to processed_dir
-        from app.workers.tasks import generate_and_apply_ai_edit_pipeline
         aspect_ratios = request.aspect_ratios or ["16:9"]
         task = generate_and_apply_ai_edit_pipeline.delay(
             job_id=job_id,
@@ -507,7 +531,6 @@ async def generate_ai_edit(
         }
     else:
         # Just generate the plan
-        from app.workers.tasks import generate_ai_edit_task_standalone
         task = generate_ai_edit_task_standalone.delay(
             job_id=job_id,
             videos_data=videos_data,
@@ -531,19 +554,21 @@ async def generate_ai_edit(
     }
 
 
-@router.get("/{video_id}/ai-edit/plan/{job_id}")
+@router.get("/{video_id}/ai-edit/plan/{job_id}", response_model=AIEditPlanResponse)
 async def get_ai_edit_plan(
     video_id: str,
     job_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get generated AI edit plan.
     """
-    job = db.query(AIEditJob).filter(
-        AIEditJob.id == job_id,
-        AIEditJob.video_id == video_id
-    ).first()
+    job = (await db.execute(
+        select(AIEditJob).where(
+            AIEditJob.id == job_id,
+            AIEditJob.video_id == video_id
+        )
+    )).scalar_one_or_none()
     
     if not job:
         raise HTTPException(status_code=404, detail="AI edit job not found")
@@ -565,25 +590,82 @@ async def get_ai_edit_plan(
 
 
 class ApplyAIEditRequest(BaseModel):
-    aspect_ratios: list = ["16:9"]
+    aspect_ratios: List[str] = Field(default_factory=lambda: ["16:9"])
+
+
+# Converted plans by AI edit job id: (completed_at, editor_edl, edit_options). A job's plan
+# doesn't change once it has completed, so re-applying it (e.g. with other aspect ratios)
+# reuses the conversion
+_converted_plans: "OrderedDict[str, tuple]" = OrderedDict()
+_CONVERTED_PLANS_MAX = 256
+
+
+def _convert_plan(job: AIEditJob) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """EditorService EDL and edit options for a completed job's LLM plan (edit options are a fresh copy)"""
+    cached = _converted_plans.get(job.id)
+    if cached is not None and cached[0] == job.completed_at:
+        _converted_plans.move_to_end(job.id)
+        _, editor_edl, edit_options = cached
+    else:
+        converter = EDLConverter()
+        editor_edl = converter.convert_llm_edl_to_editor_format(job.llm_plan.get("edl", []))
+        edit_options = converter.create_edit_options_from_plan(job.llm_plan)
+        _converted_plans[job.id] = (job.completed_at, editor_edl, edit_options)
+        if len(_converted_plans) > _CONVERTED_PLANS_MAX:
+            _converted_plans.popitem(last=False)
+    return editor_edl, dict(edit_options)
+
+
+# Media columns the render task needs (selected instead of whole Media rows)
+_MEDIA_DATA_COLUMNS = (
+    Media.video_id,
+    Media.video_url,
+    Media.original_path,
+    Media.duration_seconds,
+    Media.has_audio
+)
+
+
+def _media_data(media, transcript_segments: Optional[list]) -> Dict[str, Any]:
+    """Media fields the render task needs, so it doesn't have to query the database"""
+    return {
+        "video_url": media.video_url,
+        "original_path": media.original_path,
+        "duration_seconds": media.duration_seconds or 0.0,
+        "has_audio": media.has_audio,
+        "transcript_segments": transcript_segments
+    }
+
 
 @router.post("/{video_id}/ai-edit/apply/{job_id}")
 async def apply_ai_edit(
     video_id: str,
     job_id: str,
-    request: ApplyAIEditRequest = ApplyAIEditRequest(),
-    db: Session = Depends(get_db)
+    request: Optional[ApplyAIEditRequest] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Apply AI edit plan to video (render final output).
     """
-    job = db.query(AIEditJob).filter(
-        AIEditJob.id == job_id,
-        AIEditJob.video_id == video_id
-    ).first()
+    if request is None:
+        # No body: default aspect ratios
+        request = ApplyAIEditRequest()
+    
+    # Job, its media and transcript in one round trip (media.video_id and
+    # transcriptions.video_id are unique, so each join matches at most one row)
+    row = (await db.execute(
+        select(AIEditJob, *_MEDIA_DATA_COLUMNS, Transcript.segments)
+        .outerjoin(Media, Media.video_id == AIEditJob.video_id)
+        .outerjoin(Transcript, Transcript.video_id == AIEditJob.video_id)
+        .where(
+            AIEditJob.id == job_id,
+            AIEditJob.video_id == video_id
+        )
+    )).first()
     
-    if not job:
+    if not row:
         raise HTTPException(status_code=404, detail="AI edit job not found")
+    job = row.AIEditJob
     
     if job.status != AIEditJobStatus.COMPLETED:
         raise HTTPException(
@@ -594,11 +676,8 @@ async def apply_ai_edit(
     if not job.llm_plan:
         raise HTTPException(status_code=400, detail="No edit plan available")
     
-    # Convert LLM EDL to EditorService format
-    converter = EDLConverter()
-    editor_edl = converter.convert_llm_edl_to_editor_format(
-        job.llm_plan.get("edl", [])
-    )
+    # Convert LLM EDL to EditorService format and create edit options
+    editor_edl, edit_options = _convert_plan(job)
     
     # Validate EDL is not empty
     if not editor_edl or len(editor_edl) == 0:
@@ -607,8 +686,6 @@ async def apply_ai_edit(
             detail="No valid segments in edit plan. EDL is empty after conversion."
         )
     
-    # Create edit options
-    edit_options = converter.create_edit_options_from_plan(job.llm_plan)
     if request.aspect_ratios:
         edit_options["aspect_ratios"] = request.aspect_ratios
     
@@ -617,53 +694,35 @@ async def apply_ai_edit(
     is_multi_video = len(video_ids) > 1
     
     # Cache media data for all videos to avoid DB queries in Celery task (prevents timeout)
+    captions = bool(edit_options.get("captions"))
     if is_multi_video:
-        # Multi-video: load data for all videos
+        # Multi-video: load media and transcripts for all videos in one query
+        rows = (await db.execute(
+            select(*_MEDIA_DATA_COLUMNS, Transcript.segments)
+            .outerjoin(Transcript, Transcript.video_id == Media.video_id)
+            .where(Media.video_id.in_(video_ids))
+        )).all()
+        media_by_video_id = {media_row.video_id: media_row for media_row in rows}
+        
         multi_video_data = {}
         for vid_id in video_ids:
-            media = db.query(Media).filter(Media.video_id == vid_id).first()
-            if not media:
+            if vid_id not in media_by_video_id:
                 logger.warning(f"Media not found for video_id: {vid_id}, skipping")
                 continue
-            
-            transcript_segments = None
-            if edit_options.get("captions"):
-                transcript = db.query(Transcript).filter(Transcript.video_id == vid_id).first()
-                if transcript:
-                    transcript_segments = transcript.segments
-            
-            multi_video_data[vid_id] = {
-                "video_url": media.video_url,
-                "original_path": media.original_path,
-                "duration_seconds": media.duration_seconds or 0.0,
-                "has_audio": getattr(media, 'has_audio', True) if hasattr(media, 'has_audio') else True,
-                "transcript_segments": transcript_segments
-            }
+            media_row = media_by_video_id[vid_id]
+            multi_video_data[vid_id] = _media_data(media_row, media_row.segments if captions else None)
         
         if not multi_video_data:
             raise HTTPException(status_code=404, detail="No valid media found for video_ids")
         
         cached_media_data = None  # Not used for multi-video
     else:
-        # Single video: use existing logic
-        media = db.query(Media).filter(Media.video_id == video_id).first()
-    if not media:
-        raise HTTPException(status_code=404, detail="Media not found")
-    
-    transcript_segments = None
-    if edit_options.get("captions"):
-        transcript = db.query(Transcript).filter(Transcript.video_id == video_id).first()
-        if transcript:
-            transcript_segments = transcript.segments
-    
-    cached_media_data = {
-        "video_url": media.video_url,
-        "original_path": media.original_path,
-        "duration_seconds": media.duration_seconds or 0.0,
-        "has_audio": getattr(media, 'has_audio', True) if hasattr(media, 'has_audio') else True,
-        "transcript_segments": transcript_segments
-    }
-    multi_video_data = None
+        # Single video: media and transcript came with the job
+        if row.video_id is None:
+            raise HTTPException(status_code=404, detail="Media not found")
+        
+        cached_media_data = _media_data(row, row.segments if captions else None)
+        multi_video_data = None
     
     # Create EditJob record (will be processed by Celery)
     edit_job = EditJob(
@@ -678,12 +737,12 @@ async def apply_ai_edit(
         },
         status=EditJobStatus.QUEUED
     )
+    # Same transaction as the job lookup above; the INSERT returns edit_job.id, so there is
+    # no refresh round trip after the commit
     db.add(edit_job)
-    db.commit()
-    db.refresh(edit_job)
+    await db.commit()
     
     # Queue background rendering task (non-blocking)
-    from app.workers.tasks import apply_ai_edit_task
     task = apply_ai_edit_task.delay(str(edit_job.id))
     logger.info(f"AI edit rendering queued: EditJob {edit_job.id}, Celery task {task.id}")
     
@@ -696,27 +755,33 @@ async def apply_ai_edit(
     }
 
 
-@router.get("/{video_id}/ai-edit")
-async def list_ai_edit_jobs(video_id: str, db: Session = Depends(get_db)):
+def _json_is_set(column):
+    """SQL truthiness of a JSON column (not NULL, JSON null or {}), evaluated by the database"""
+    return and_(column.isnot(None), cast(column, Text).notin_(("null", "{}")))
+
+
+@router.get("/{video_id}/ai-edit", response_model=ListAIEditJobsResponse)
+async def list_ai_edit_jobs(video_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     List all AI edit jobs for a video.
     """
-    jobs = db.query(AIEditJob).filter(
-        AIEditJob.video_id == video_id
-    ).order_by(AIEditJob.created_at.desc()).all()
+    # Only the listed columns: llm_plan and output_paths can be large JSON, and only
+    # whether they are set is returned
+    jobs = (await db.execute(
+        select(
+            AIEditJob.id,
+            AIEditJob.status,
+            AIEditJob.created_at,
+            AIEditJob.completed_at,
+            _json_is_set(AIEditJob.llm_plan).label("has_plan"),
+            _json_is_set(AIEditJob.output_paths).label("has_output")
+        ).where(
+            AIEditJob.video_id == video_id
+        ).order_by(AIEditJob.created_at.desc())
+    )).mappings().all()
     
     return {
         "video_id": video_id,
-        "jobs": [
-            {
-                "id": job.id,
-                "status": job.status,
-                "created_at": job.created_at,
-                "completed_at": job.completed_at,
-                "has_plan": bool(job.llm_plan),
-                "has_output": bool(job.output_paths)
-            }
-            for job in jobs
-        ]
+        "jobs": [dict(job) for job in jobs]
     }
 
@@ -4,6 +4,7 @@ Complete workflow: Generate AI edit -> Apply -> Upload to S3 -> Callback
 Designed for external integrations (e.g., iMessage)
 """
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, HttpUrl
@@ -82,6 +83,10 @@ async def unified_ai_edit(
     
     # Create AI edit job
     try:
+        if db.get_bind().dialect.name == "postgresql":
+            # The job row is only a queue record (the workflow can be resubmitted), so this
+            # transaction's commit doesn't wait for the WAL flush
+            db.execute(text("SET LOCAL synchronous_commit = off"))
         ai_edit_job = AIEditJob(
             video_id=primary_video_id,
             video_ids=request.video_ids if is_multi_video else None,
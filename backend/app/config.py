@@ -56,6 +56,12 @@ class Settings(BaseSettings):
     
     DB_ECHO: bool = False
     
+    # Async engine pool (API endpoints); Postgres throughput peaks around 25 connections
+    DB_POOL_SIZE: int = 25
+    DB_MAX_OVERFLOW: int = 25
+    DB_POOL_TIMEOUT: int = 10  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Reconnect after 30 min (poolers drop idle connections)
+    
     def get_database_url(self) -> str:
         """Construct database URL from components or use DATABASE_URL"""
         # If DATABASE_URL is explicitly set, use it
@@ -1,4 +1,7 @@
+import asyncio
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
@@ -11,6 +14,7 @@ database_url = settings.get_database_url()
 
 # Configure engine based on database type
 connect_args = {}
+engine_args = {}
 pool_class = None
 
 if database_url.startswith("sqlite"):
@@ -26,6 +30,13 @@ else:
     }
     # If using transaction pooler (port 6543), uncomment:
     # pool_class = NullPool
+    # Send ORM bulk INSERT/UPDATE/DELETE as multi-row VALUES / execute_batch pages instead
+    # of one statement per row (psycopg2 dialect option)
+    if make_url(database_url).drivername in ("postgresql", "postgresql+psycopg2"):
+        engine_args = {
+            "executemany_mode": "values_plus_batch",
+            "executemany_batch_page_size": 500,
+        }
 
 engine = create_engine(
     database_url,
@@ -34,15 +45,62 @@ engine = create_engine(
     pool_pre_ping=True,  # Verify connections before using
     pool_size=5,  # Adjust based on your needs
     max_overflow=10,
-    echo=settings.DB_ECHO
+    echo=settings.DB_ECHO,
+    **engine_args
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-def get_db():
+# Async engine for API endpoints (same database, async driver: asyncpg / aiosqlite)
+# Celery tasks and services keep using the sync engine above
+async_database_url = make_url(database_url)
+if async_database_url.drivername.startswith("sqlite"):
+    async_database_url = async_database_url.set(drivername="sqlite+aiosqlite")
+    async_connect_args = {}
+    # aiosqlite gets NullPool (StaticPool for :memory:), which take no pool sizing arguments
+    async_engine_args = {}
+else:
+    # asyncpg takes ssl/timeout as connect arguments instead of the sslmode URL parameter
+    async_database_url = async_database_url.set(
+        drivername="postgresql+asyncpg",
+        query={k: v for k, v in async_database_url.query.items() if k != "sslmode"}
+    )
+    async_connect_args = {
+        "timeout": 10,
+        "ssl": "require",
+    }
+    # The transaction pooler (port 6543, PgBouncer) can't keep prepared statements
+    if async_database_url.port == 6543:
+        async_connect_args["statement_cache_size"] = 0
+    async_engine_args = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+async_engine = create_async_engine(
+    async_database_url,
+    connect_args=async_connect_args,
+    poolclass=pool_class,
+    pool_pre_ping=True,
+    echo=settings.DB_ECHO,
+    **async_engine_args
+)
+
+# expire_on_commit=False so objects stay readable after commit without an implicit (sync) reload
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_db():
+    # async so FastAPI resolves the dependency on the event loop instead of a threadpool;
+    # creating a Session does no I/O, but close() returns (and resets) its connection
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        await asyncio.to_thread(db.close)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,8 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from app.api import upload, edit, ai_edit, unified_ai_edit
-from app.database import engine, Base
+from app.database import engine, async_engine, Base
 from app.config import get_settings
 # Import all models to ensure they're registered with Base
 from app.models import (
@@ -26,7 +27,8 @@ Base.metadata.create_all(bind=engine)
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.VERSION,
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    default_response_class=ORJSONResponse  # orjson: faster serialization, native datetime support
 )
 
 # Dynamic CORS
@@ -43,6 +45,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def warm_db_pool():
+    """Open a pooled connection up front so the first request doesn't pay for connecting"""
+    async with async_engine.begin():
+        pass
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    await async_engine.dispose()
+
 # Serve static files
 app.mount("/storage", StaticFiles(directory=str(settings.BASE_STORAGE_PATH)), name="storage")
 
@@ -2,7 +2,7 @@
 AI Edit Job Model
 Tracks AI-driven storytelling edit jobs
 """
-from sqlalchemy import Column, String, JSON, ForeignKey, Enum as SQLEnum, Text, Float, DateTime
+from sqlalchemy import Column, String, JSON, ForeignKey, Enum as SQLEnum, Text, Float, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -49,4 +49,10 @@ class AIEditJob(Base):
     
     # Relationships
     media = relationship("Media", back_populates="ai_edit_jobs")
+    
+    # Indexes (job lookups filter on video_id + id; job lists on video_id, newest first)
+    __table_args__ = (
+        Index('idx_ai_edit_jobs_video_id_id', 'video_id', 'id'),
+        Index('idx_ai_edit_jobs_video_created', 'video_id', created_at.desc()),
+    )
 
@@ -16,4 +16,8 @@ celery_app.conf.update(
     result_serializer='json',
     timezone='UTC',
     enable_utc=True,
+    # Broker connections kept open for publishing; API requests dispatch tasks
+    # (.delay) from this pool instead of connecting to Redis each time
+    broker_pool_limit=25,
+    broker_transport_options={"visibility_timeout": 3600},
 )
\ No newline at end of file
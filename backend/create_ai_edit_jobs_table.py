@@ -48,6 +48,8 @@ def main():
     
     CREATE INDEX IF NOT EXISTS idx_ai_edit_jobs_video_id ON ai_edit_jobs(video_id);
     CREATE INDEX IF NOT EXISTS idx_ai_edit_jobs_status ON ai_edit_jobs(status);
+    CREATE INDEX IF NOT EXISTS idx_ai_edit_jobs_video_id_id ON ai_edit_jobs(video_id, id);
+    CREATE INDEX IF NOT EXISTS idx_ai_edit_jobs_video_created ON ai_edit_jobs(video_id, created_at DESC);
     """
     
     db = SessionLocal()